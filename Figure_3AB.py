@@ -23,8 +23,12 @@ list of output files:
 """
 
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+from analysis_session import current_session
+from figure_mode import configure, lazy_import
+from figure_sink import finish_figures, save_figure
+
+plt = lazy_import('matplotlib.pyplot')
+sns = lazy_import('seaborn')
 
 # =============================================
 # disable chain assignment warning
@@ -35,11 +39,13 @@ pd.options.mode.chained_assignment = None  # default='warn'
 sizeMult = 1
 saveplot = 1  # 1 or 0; 1 saves plots in the folder "./analysis_output" without showing them; 0 shows without plotting
 savetable = 1  # 1 or 0; 1 saves tables in "./analysis_output" without showing them
+plotting = configure(saveplot)  # False in the tables-only mode (FIGURE_MODE=tables): the plots are not drawn
 
 labelFontSize = 6
 
-sns.set(style="whitegrid")
-sns.set_context("paper")
+if plotting:
+    sns.set(style="whitegrid")
+    sns.set_context("paper")
 
 # =============================================
 # Parameters for the analysis
@@ -57,135 +63,128 @@ bin_size = 5
 pd.options.mode.chained_assignment = None
 
 # =============================================
-# Load color palette from animals metadata file
-# Assign unique identifier to animals based on the AnimalDictionary.csv
-
-csv_file = './data/Animals_metaData.csv'
-AnimalDictionary = pd.read_csv(csv_file, low_memory=False, sep=';')
-palette = pd.DataFrame()
-for m in AnimalDictionary.monkey.unique():
-    palette = palette.append({
-        'animal': AnimalDictionary[AnimalDictionary.monkey == m].ID.to_list()[0],
-        'color': [AnimalDictionary[AnimalDictionary.monkey == m]['palette_r'].values[0],
-                  AnimalDictionary[AnimalDictionary.monkey == m]['palette_g'].values[0],
-                  AnimalDictionary[AnimalDictionary.monkey == m]['palette_b'].values[0]]},
-        ignore_index=True)
-
-# Create unique palette for each animal
-sns.set_palette(sns.color_palette("deep", n_colors=14))
-palette = dict(zip(palette.animal, palette.color))
+# Create unique palette for each animal; the colour of each animal is given by the analysis session
+if plotting:
+    sns.set_palette(sns.color_palette("deep", n_colors=14))
 
 # =============================================
 # Load the data for Figure 3A
 
-def dataload():
-    performance_df = pd.read_csv('./data/Figure_3AB.csv', low_memory=False, decimal=',')
-
-    # Format the columns of the imported curated data file
-    performance_df['p_trials'] = performance_df['p_trials'].astype(int)
-    performance_df['HitRate'] = performance_df['HitRate'].astype(float)
-    performance_df['Trials'] = performance_df['Trials'].astype(int)
+def dataload(session):
+    performance_df = session.table('Figure_3AB.csv')
 
     return performance_df
 
 
-# ========================================================
-# FIGURE 3AB
-figure3A_height = (60 / 25.4) * sizeMult
-figure3A_width = (120 / 25.4) * sizeMult
+def figure_3AB(session):
+    """Plots of Figure 3A-B, from the data of the session."""
+    # Figure 3A-B has no tables
+    if not plotting:
+        return
+
+    palette = session.palette()
+
+    # ========================================================
+    # FIGURE 3AB
+    figure3A_height = (60 / 25.4) * sizeMult
+    figure3A_width = (120 / 25.4) * sizeMult
+
+    # load the data
+    performance_df = dataload(session)
+    plot_df = performance_df.groupby(['sessionType', 'monkey', 'p_trials', 'Trials'])['HitRate'].mean().reset_index()
+
+    # initialize the figure
+    f, (ax1, ax2) = plt.subplots(1, 2, sharey=False, gridspec_kw={'width_ratios': [1, 1, ]},
+                                 constrained_layout=False, figsize=(figure3A_width, figure3A_height))
 
-# load the data
-performance_df = dataload()
-plot_df = performance_df.groupby(['sessionType', 'monkey', 'p_trials', 'Trials'])['HitRate'].mean().reset_index()
+    # Plot the Natural Discrimination, 3 Visual Stimuli condition
+    sizes = (min(performance_df[performance_df['sessionType'] == '2 Visual Stimuli'].Trials.values),
+             max(performance_df[performance_df['sessionType'] == '2 Visual Stimuli'].Trials.values))
 
-# initialize the figure
-f, (ax1, ax2) = plt.subplots(1, 2, sharey=False, gridspec_kw={'width_ratios': [1, 1, ]},
-                             constrained_layout=False, figsize=(figure3A_width, figure3A_height))
+    size_thick = (2, 4)
+    g = sns.lineplot(x="p_trials", y="HitRate", size='Trials', sizes=size_thick, hue="monkey", legend='brief',
+                     data=plot_df[plot_df['sessionType'] == '2 Visual Stimuli'], ax=ax1, palette=palette)
 
-# Plot the Natural Discrimination, 3 Visual Stimuli condition
-sizes = (min(performance_df[performance_df['sessionType'] == '2 Visual Stimuli'].Trials.values),
-         max(performance_df[performance_df['sessionType'] == '2 Visual Stimuli'].Trials.values))
+    ax1.set(xlim=[0, 100], ylim=[0, 1])
+    ax1.set_ylabel(ylabel='Hit Rate', fontsize=labelFontSize)
+    ax1.set_xlabel(xlabel='Percentage of Trials', fontsize=labelFontSize)
+    ax1.set_title('2 Visual Stimuli', fontsize=labelFontSize)
+    ax1.tick_params(labelsize=labelFontSize)
 
-size_thick = (2, 4)
-g = sns.lineplot(x="p_trials", y="HitRate", size='Trials', sizes=size_thick, hue="monkey", legend='brief',
-                 data=plot_df[plot_df['sessionType'] == '2 Visual Stimuli'], ax=ax1, palette=palette)
+    # Manually create a legend for the total trial
+    handles, labels = [(a + b) for a, b, in zip(ax1.get_legend_handles_labels(), ax2.get_legend_handles_labels())]
+    idx = [10, 11, 12, 13, 14, 15]
 
-ax1.set(xlim=[0, 100], ylim=[0, 1])
-ax1.set_ylabel(ylabel='Hit Rate', fontsize=labelFontSize)
-ax1.set_xlabel(xlabel='Percentage of Trials', fontsize=labelFontSize)
-ax1.set_title('2 Visual Stimuli', fontsize=labelFontSize)
-ax1.tick_params(labelsize=labelFontSize)
+    l = []
+    h = []
 
-# Manually create a legend for the total trial
-handles, labels = [(a + b) for a, b, in zip(ax1.get_legend_handles_labels(), ax2.get_legend_handles_labels())]
-idx = [10, 11, 12, 13, 14, 15]
+    for i in idx:
+        l.append(labels[i])
+        h.append(handles[i])
 
-l = []
-h = []
+    l[0] = 'Trials'
+    g.legend(h, l, loc='lower center', ncol=2, frameon=False, title=None, fontsize=labelFontSize)
 
-for i in idx:
-    l.append(labels[i])
-    h.append(handles[i])
+    ax1.set_yticks([0.25, 0.5, 0.75, 1])
+    ax1.axhline(0.50, color='grey', linestyle='--')
+    ax1.tick_params(axis=u'both', which=u'both', length=0)
 
-l[0] = 'Trials'
-g.legend(h, l, loc='lower center', ncol=2, frameon=False, title=None, fontsize=labelFontSize)
+    # Plot the Natural Discrimination, 3 Visual Stimuli condition
+    sizes = (min(plot_df[plot_df['sessionType'] == '3 Visual Stimuli'].Trials.values),
+             max(plot_df[plot_df['sessionType'] == '3 Visual Stimuli'].Trials.values))
 
-ax1.set_yticks([0.25, 0.5, 0.75, 1])
-ax1.axhline(0.50, color='grey', linestyle='--')
-ax1.tick_params(axis=u'both', which=u'both', length=0)
+    size_thick = (2, 3.5)
 
-# Plot the Natural Discrimination, 3 Visual Stimuli condition
-sizes = (min(plot_df[plot_df['sessionType'] == '3 Visual Stimuli'].Trials.values),
-         max(plot_df[plot_df['sessionType'] == '3 Visual Stimuli'].Trials.values))
+    g = sns.lineplot(x="p_trials", y="HitRate", size='Trials', sizes=size_thick, hue="monkey", legend='brief',
+                     data=plot_df[plot_df['sessionType'] == '3 Visual Stimuli'], ax=ax2, palette=palette)
 
-size_thick = (2, 3.5)
+    ax2.set(xlim=[0, 100], ylim=[0, 1])
+    ax2.set_ylabel(ylabel=None)
+    ax2.set_xlabel(xlabel='Percentage of Trials', fontsize=labelFontSize)
+    ax2.tick_params(labelsize=labelFontSize)
+    ax2.set_title('3 Visual Stimuli', fontsize=labelFontSize)
 
-g = sns.lineplot(x="p_trials", y="HitRate", size='Trials', sizes=size_thick, hue="monkey", legend='brief',
-                 data=plot_df[plot_df['sessionType'] == '3 Visual Stimuli'], ax=ax2, palette=palette)
+    ax2.set_yticks([0.16, 0.33, 0.5, 0.66, 0.82, 1])
+    ax2.axhline(0.33, color='grey', linestyle='--')
 
-ax2.set(xlim=[0, 100], ylim=[0, 1])
-ax2.set_ylabel(ylabel=None)
-ax2.set_xlabel(xlabel='Percentage of Trials', fontsize=labelFontSize)
-ax2.tick_params(labelsize=labelFontSize)
-ax2.set_title('3 Visual Stimuli', fontsize=labelFontSize)
+    handles, labels = [(a + b) for a, b, in zip(ax1.get_legend_handles_labels(), ax2.get_legend_handles_labels())]
+    idx = [21, 22, 23, 24, 25]
 
-ax2.set_yticks([0.16, 0.33, 0.5, 0.66, 0.82, 1])
-ax2.axhline(0.33, color='grey', linestyle='--')
+    l = []
+    h = []
 
-handles, labels = [(a + b) for a, b, in zip(ax1.get_legend_handles_labels(), ax2.get_legend_handles_labels())]
-idx = [21, 22, 23, 24, 25]
+    for i in idx:
+        l.append(labels[i])
+        h.append(handles[i])
 
-l = []
-h = []
+    l[0] = 'Trials'
+    g.legend(h, l, loc='lower center', ncol=2, frameon=False, title=None, fontsize=labelFontSize)
 
-for i in idx:
-    l.append(labels[i])
-    h.append(handles[i])
+    # Add figure level legend for the animal names
+    ax3 = ax2.twinx()
+    ax3.get_yaxis().set_visible(False)
+    ax3.set_yticklabels([])
+    ax2.tick_params(axis=u'both', which=u'both', length=0)
 
-l[0] = 'Trials'
-g.legend(h, l, loc='lower center', ncol=2, frameon=False, title=None, fontsize=labelFontSize)
+    handles, labels = [(a + b) for a, b, in zip(ax1.get_legend_handles_labels(), ax2.get_legend_handles_labels())]
+    idx = [0, 1, 2, 3, 4, 5, 6, 17, 18, 7, 8, 9]
 
-# Add figure level legend for the animal names
-ax3 = ax2.twinx()
-ax3.get_yaxis().set_visible(False)
-ax3.set_yticklabels([])
-ax2.tick_params(axis=u'both', which=u'both', length=0)
+    l = []
+    h = []
 
-handles, labels = [(a + b) for a, b, in zip(ax1.get_legend_handles_labels(), ax2.get_legend_handles_labels())]
-idx = [0, 1, 2, 3, 4, 5, 6, 17, 18, 7, 8, 9]
+    for i in idx:
+        l.append(labels[i])
+        h.append(handles[i])
 
-l = []
-h = []
+    l[0] = 'Animals'
+    ax3.legend(h, l, loc='center right', bbox_to_anchor=(1.45, 0.5), ncol=1, frameon=False, title=None,
+               fontsize=labelFontSize)
 
-for i in idx:
-    l.append(labels[i])
-    h.append(handles[i])
+    # Save the figure
+    if saveplot:
+        save_figure('Figure_3AB')
 
-l[0] = 'Animals'
-ax3.legend(h, l, loc='center right', bbox_to_anchor=(1.45, 0.5), ncol=1, frameon=False, title=None, fontsize=labelFontSize)
 
-# Save the figure
-if saveplot:
-    plt.savefig('./analysis_output/Figure_3AB.pdf', format='pdf')
-    plt.savefig('./analysis_output/Figure_3AB.png', format='png')
-    plt.close()
+if __name__ == '__main__':
+    figure_3AB(current_session())
+    finish_figures()
@@ -22,53 +22,69 @@ list of output files:
 
 """
 
-import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
-from scipy.io import wavfile
 import os
+from analysis_session import current_session
+from decimation import plot_envelope
+from figure_mode import configure, lazy_import
+from figure_sink import finish_figures, save_figure
+from streaming_audio import open_recording, stream_spectrogram
+
+plt = lazy_import('matplotlib.pyplot')
 
 # Read the wav file (mono)
 file_path = "./background_recordings/"
-save_path = "./analysis_output/"
+plotting = configure(1)  # the plots are always saved; False in the tables-only mode (FIGURE_MODE=tables)
 
 sounds = [ os.path.join(file_path, 'clip1_MS.wav'),
            os.path.join(file_path, 'clip2_MS.wav'),
            os.path.join(file_path, 'clip3_MS.wav')]
 
-psdData = './data/PSD_data.csv'
-
-for idx, s in enumerate(sounds):
-    samplingFrequency, signalData = wavfile.read(s)
-
-    # Plot the signal read from wav file
-    plt.subplot(211)
-    plt.title('Spectrogram ')
-
-    plt.plot(signalData)
-    plt.xlabel('Sample')
-    plt.ylabel('Amplitude')
-
-    plt.subplot(212)
-    plt.specgram(signalData,Fs=samplingFrequency, cmap='jet')
-    plt.xlabel('Time')
-    plt.ylabel('Frequency')
-
-    filename = "{}{}{}{}{}{}".format(save_path, '/', 'Figure_5C', '_spectrogram_', idx+1, '.pdf')
-    plt.savefig(filename, format='pdf')
-    plt.close()
-           
-           
-
-# Power spectral desity plot
-psdDF = pd.read_csv(psdData)
-plt.figure(figsize=(5, 4))
-plt.plot(psdDF['freq'], psdDF['power'])
-plt.title('PSD: power spectral density')
-plt.xlabel('Frequency')
-plt.ylabel('Power')
-plt.tight_layout()
-
-filename = "{}{}{}{}".format(save_path, '/', 'Figure_5C','_PSD.pdf')
-plt.savefig(filename, format='pdf')
-plt.close()
+psdData = 'PSD_data.csv'
+
+def figure_5C(session):
+    """Spectrograms and power spectral density of Figure 5C, from the data of the session."""
+    # Figure 5C has no tables
+    if not plotting:
+        return
+
+    for idx, s in enumerate(sounds):
+        # The recordings are memory-mapped, not loaded
+        samplingFrequency, signalData = open_recording(s)
+
+        # Plot the signal read from wav file
+        plt.subplot(211)
+        plt.title('Spectrogram ')
+
+        # Minimum and maximum per pixel column instead of every sample
+        plot_envelope(plt.gca(), signalData)
+        plt.xlabel('Sample')
+        plt.ylabel('Amplitude')
+
+        plt.subplot(212)
+        power, freqs, extent = stream_spectrogram(signalData, samplingFrequency)
+        plt.imshow(np.flipud(10. * np.log10(power)), cmap='jet', extent=extent, origin='upper')
+        plt.axis('auto')
+        plt.xlabel('Time')
+        plt.ylabel('Frequency')
+
+        save_figure('Figure_5C_spectrogram_{}'.format(idx + 1), formats=('pdf',))
+
+
+
+    # Power spectral desity plot
+    psdDF = session.table(psdData)
+    plt.figure(figsize=(5, 4))
+    plt.plot(psdDF['freq'], psdDF['power'])
+    plt.title('PSD: power spectral density')
+    plt.xlabel('Frequency')
+    plt.ylabel('Power')
+    plt.tight_layout()
+
+    save_figure('Figure_5C_PSD', formats=('pdf',))
+
+
+if __name__ == '__main__':
+    figure_5C(current_session())
+    finish_figures()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Analysis session shared by the figure scripts: every data file is loaded once per interpreter.
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+The figure functions take the session as argument and ask it for their data. The session loads a
+curated data file the first time it is asked for it and keeps it; the colour palette of the
+animals is built once from Animals_metaData.csv. Frames derived from the data (e.g. a grouped
+summary used by several panels) are kept under a key, and the least recently used ones are
+dropped when more than maxsize are kept.
+
+The frames handed out share their values with the stored frame, whose numeric values are read-only:
+columns can be added or replaced as usual, but writing into the values (e.g. df.loc[rows, column] =
+value) raises an error instead of silently changing the data for every later figure. Filtering,
+sorting or grouping a frame gives a new frame that can be changed freely; a figure that writes into
+its data asks for a copy.
+
+Running this file runs all figure scripts in one interpreter with a single session and reports how
+often each data file was read.
+
+"""
+
+import os
+import time
+from collections import Counter, OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from data_schema import load_table
+
+PALETTE_COLUMNS = ['palette_r', 'palette_g', 'palette_b']
+
+
+def read_only(df):
+    """Frame with the values of df, the numeric columns copied once into arrays marked read-only."""
+    if df.shape[1] == 0:
+        return df.copy()
+    columns = []
+    for position in range(df.shape[1]):
+        column = df.iloc[:, position]
+        # Object columns stay writable: pandas compares strings through buffers that must be writable,
+        # extension columns (e.g. categorical) are kept as they are
+        if isinstance(column.dtype, np.dtype) and column.dtype != object:
+            values = column.to_numpy(copy=True)
+            values.flags.writeable = False
+            column = pd.Series(values, index=df.index, name=column.name, copy=False)
+        columns.append(column)
+
+    return pd.concat(columns, axis=1, copy=False)
+
+
+def animal_palette(AnimalDictionary):
+    """Colour of every animal ID (first row of every monkey), as built by the figure scripts."""
+    first = AnimalDictionary.drop_duplicates('monkey')
+
+    return dict(zip(first['ID'], first[PALETTE_COLUMNS].to_numpy().tolist()))
+
+
+class AnalysisSession:
+
+    def __init__(self, data_path='./data', maxsize=32):
+        self.data_path = data_path
+        self.maxsize = maxsize
+        self.loads = Counter()
+        self._tables = {}
+        self._derived = OrderedDict()
+        self._palette = None
+
+    def table(self, name):
+        """Read-only view of a curated data file (by file name), loaded the first time it is asked for."""
+        if name not in self._tables:
+            self._tables[name] = read_only(load_table(os.path.join(self.data_path, name)))
+            self.loads[name] += 1
+
+        return self._tables[name].copy(deep=False)
+
+    def palette(self):
+        """Colour of every animal ID."""
+        if self._palette is None:
+            self._palette = animal_palette(self.table('Animals_metaData.csv'))
+
+        return dict(self._palette)
+
+    def derived(self, key, function, *args, **kwargs):
+        """Result of function(*args, **kwargs), computed once per key; frames are handed out as read-only views."""
+        if key in self._derived:
+            self._derived.move_to_end(key)
+        else:
+            result = function(*args, **kwargs)
+            self._derived[key] = read_only(result) if isinstance(result, pd.DataFrame) else result
+            while len(self._derived) > self.maxsize:
+                self._derived.popitem(last=False)
+
+        result = self._derived[key]
+
+        return result.copy(deep=False) if isinstance(result, pd.DataFrame) else result
+
+
+_session = None
+
+
+def current_session():
+    """The session of this interpreter, created when it is first needed."""
+    global _session
+    if _session is None:
+        _session = AnalysisSession()
+
+    return _session
+
+
+if __name__ == '__main__':
+    import glob
+    import runpy
+
+    import matplotlib
+    matplotlib.use('Agg')
+
+    # All figure scripts in this interpreter, sharing the session of the imported module (not of __main__)
+    import analysis_session
+    session = analysis_session.current_session()
+    timings = {}
+    for script in sorted(glob.glob('Figure_*.py')):
+        start = time.perf_counter()
+        try:
+            runpy.run_path(script, run_name='__main__')
+            status = 'ok'
+        except Exception as error:
+            status = '{}: {}'.format(type(error).__name__, error)[:60]
+        timings[script] = (time.perf_counter() - start, status)
+
+    print("{:<18}{:>10}  {}".format('script', 'time [s]', 'status'))
+    for script, (elapsed, status) in timings.items():
+        print("{:<18}{:>10.1f}  {}".format(script, elapsed, status))
+    print("\nfiles read: {}".format(dict(session.loads)))
+    assert all(count == 1 for count in session.loads.values())
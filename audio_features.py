@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Cached spectrograms and waveform envelopes of the acoustic stimuli (Figure 4A).
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+For every stimulus the features needed for its panels are computed once: the spectrogram in dB
+(as drawn by matplotlib's specgram, with fixed NFFT and overlap), the minimum and maximum of the
+waveform in a fixed number of columns (enough for a panel of Figure 4A even at print resolution,
+see decimation.py), and the metadata of the file (sampling frequency, number of samples, duration,
+sample type). They are saved as a compressed .npz in "./data/.cache/audio" under the hash of the
+wav file and the parameters, so a stimulus is analysed again only when its file changes. Drawing
+the panels from the features (imshow and fill_between) costs the same for a short tone and for a
+long vocalisation.
+
+Running this file compares drawing the stimuli in "./audio_files" and a synthetic ten minute recording
+from the raw samples and from the features.
+
+"""
+
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from matplotlib import mlab
+from scipy.io import wavfile
+
+import data_cache
+from decimation import envelope
+
+FEATURE_CACHE_VERSION = 1
+
+
+def _feature_cache_path():
+    return os.path.join(data_cache.cache_path, 'audio')
+
+
+def compute_features(filename, NFFT=256, noverlap=128, n_columns=500, max_frames=2000):
+    """Spectrogram (dB), waveform envelope and metadata of a wav file."""
+    samplingFrequency, signalData = wavfile.read(filename)
+    # The stimuli are mono; of a multi-channel file the first channel is used
+    if signalData.ndim > 1:
+        signalData = signalData[:, 0]
+
+    # Same spectrogram and extent as matplotlib's specgram with its default (psd, dB) scaling
+    spec, freqs, t = mlab.specgram(signalData, NFFT=NFFT, Fs=samplingFrequency, noverlap=noverlap)
+    pad = (NFFT - noverlap) / samplingFrequency / 2
+    extent = np.array([t.min() - pad, t.max() + pad, freqs[0], freqs[-1]])
+
+    # Long files: the power of neighbouring frames is averaged down to max_frames columns
+    if spec.shape[1] > max_frames:
+        step = -(-spec.shape[1] // max_frames)
+        starts = np.arange(0, spec.shape[1], step)
+        spec = np.add.reduceat(spec, starts, axis=1) / np.diff(np.append(starts, spec.shape[1]))
+
+    positions, minima, maxima = envelope(signalData, n_columns)
+
+    # Half precision (steps of at most 0.06 dB up to 128 dB) is far finer than a colour map shows and halves
+    # the stored size
+    return {'sampling_frequency': samplingFrequency, 'n_samples': len(signalData),
+            'duration': len(signalData) / samplingFrequency, 'dtype': str(signalData.dtype),
+            'spectrogram': np.flipud(10. * np.log10(spec)).astype(np.float16), 'extent': extent,
+            'envelope_x': positions, 'envelope_min': minima, 'envelope_max': maxima}
+
+
+def _save(filename, features):
+    # Few members in the archive: every member costs a separate lookup and decompression when loading
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(filename), suffix='.npz')
+    with os.fdopen(handle, 'wb') as file_object:
+        np.savez_compressed(file_object, spectrogram=features['spectrogram'],
+                            envelope=np.vstack([features['envelope_x'], features['envelope_min'],
+                                                features['envelope_max']]).astype(np.float64),
+                            metadata=np.concatenate([[features['sampling_frequency'], features['n_samples'],
+                                                      features['duration']], features['extent']]),
+                            dtype=features['dtype'])
+    os.replace(temporary, filename)
+
+
+def _load(filename):
+    with np.load(filename) as stored:
+        spectrogram, envelope, metadata, dtype = (stored[name] for name in
+                                                  ['spectrogram', 'envelope', 'metadata', 'dtype'])
+
+    return {'sampling_frequency': int(metadata[0]), 'n_samples': int(metadata[1]), 'duration': metadata[2],
+            'dtype': str(dtype), 'spectrogram': spectrogram, 'extent': metadata[3:],
+            'envelope_x': envelope[0].astype(np.int64), 'envelope_min': envelope[1], 'envelope_max': envelope[2]}
+
+
+def load_features(filename, NFFT=256, noverlap=128, n_columns=500, max_frames=2000, use_cache=True):
+    """Features of a wav file, computed only when the file (or the parameters) changed."""
+    if not use_cache:
+        return compute_features(filename, NFFT, noverlap, n_columns, max_frames)
+
+    parameters = json.dumps({'version': FEATURE_CACHE_VERSION, 'NFFT': NFFT, 'noverlap': noverlap,
+                             'n_columns': n_columns, 'max_frames': max_frames}, sort_keys=True)
+    key = hashlib.sha1((data_cache.file_hash(filename) + parameters).encode()).hexdigest()
+    target = os.path.join(_feature_cache_path(), key + '.npz')
+
+    if os.path.exists(target):
+        return _load(target)
+
+    features = compute_features(filename, NFFT, noverlap, n_columns, max_frames)
+    _save(target, features)
+
+    return features
+
+
+def plot_waveform(ax, features, **kwargs):
+    """Draw the waveform as the band between its minimum and maximum (x in samples, as plot(signalData))."""
+    kwargs.setdefault('color', 'C0')
+    kwargs.setdefault('linewidth', 0.5)
+
+    return ax.fill_between(features['envelope_x'], features['envelope_min'], features['envelope_max'], **kwargs)
+
+
+def plot_spectrogram(ax, features, cmap='jet'):
+    """Draw the spectrogram as specgram does (time in s, frequency in Hz)."""
+    im = ax.imshow(features['spectrogram'], cmap=cmap, extent=tuple(features['extent']), origin='upper')
+    ax.axis('auto')
+
+    return im
+
+
+if __name__ == '__main__':
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    # The stimuli of Figure 4A and a synthetic ten minute recording at 96 kHz
+    directory = tempfile.mkdtemp()
+    rng = np.random.default_rng(0)
+    long_sound = os.path.join(directory, 'long.wav')
+    wavfile.write(long_sound, 96000, (rng.normal(0, 3000, 96000 * 600)).astype(np.int16))
+    sounds = sorted(glob.glob(os.path.join('./audio_files', '*.wav'))) + [long_sound]
+
+    def draw(sound, use_features):
+        f, ax = plt.subplots(2, 1, figsize=(1.4, 2.4))
+        start = time.perf_counter()
+        if use_features:
+            features = load_features(sound)
+            plot_waveform(ax[0], features)
+            plot_spectrogram(ax[1], features)
+        else:
+            samplingFrequency, signalData = wavfile.read(sound)
+            ax[0].plot(signalData)
+            ax[1].specgram(signalData, Fs=samplingFrequency, cmap='jet')
+        f.canvas.draw()
+        elapsed = time.perf_counter() - start
+        plt.close(f)
+
+        return elapsed
+
+    print("{:<28}{:>12}{:>16}{:>16}{:>16}".format('file', 'samples', 'raw [ms]', 'first [ms]', 'cached [ms]'))
+    for sound in sounds:
+        timings = [draw(sound, False), draw(sound, True), draw(sound, True)]
+        print("{:<28}{:>12}{:>16.0f}{:>16.0f}{:>16.0f}".format(
+            os.path.basename(sound), load_features(sound)['n_samples'], *[t * 1000 for t in timings]))
+
+    os.remove(long_sound)
+    os.rmdir(directory)
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Bootstrap confidence intervals of hit rate, ignore rate and d' (tables of Figure 3C, 4C and S1).
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+The HR tables (e.g. Figure_3C_HR.csv) hold the number of hits, wrong and ignored trials of every
+animal x task x stimulus. Resampling the trials of a row with replacement is the same as drawing
+new counts from a multinomial distribution with the observed proportions, so all rows and many
+resamples are drawn at once with a single multinomial call. The resamples are split in chunks of
+fixed size that run in a pool of processes; every chunk has its own seed spawned from the main
+seed, so the intervals do not depend on the number of processes.
+
+Running this file computes the intervals for the tables of Figure 3C and 4C and compares the time
+with resampling the trials in a pandas loop.
+
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from dPrime_2AFC import dPrime_2AFC
+
+# Columns of the HR tables with the number of trials of each outcome
+OUTCOMES = ('hits_n', 'wrong_n', 'ignored_n')
+
+
+def _bootstrap_chunk(counts, pair_A, pair_B, n_resamples, seed):
+    # Resample the trials of every row and compute the statistics of each resample
+    rng = np.random.default_rng(seed)
+    n_trials = counts.sum(axis=1)
+    proportions = counts / np.maximum(n_trials, 1)[:, None]
+    resampled = rng.multinomial(n_trials, proportions, size=(n_resamples, len(counts)))
+
+    hits, wrong, ignored = resampled[:, :, 0], resampled[:, :, 1], resampled[:, :, 2]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hit_rate = hits / n_trials
+        ignore_rate = ignored / n_trials
+
+        # Stimulus A chosen when A or B was presented, as expected by dPrime_2AFC
+        resp_A = np.stack([hits[:, pair_A], wrong[:, pair_A]], axis=-1).reshape(-1, 2)
+        resp_B = np.stack([wrong[:, pair_B], hits[:, pair_B]], axis=-1).reshape(-1, 2)
+        dprime = dPrime_2AFC(resp_A, resp_B).reshape(n_resamples, len(pair_A))
+
+    return hit_rate, ignore_rate, dprime
+
+
+def bootstrap_rates(hr_table, keys=('monkey', 'task'), stimulus='stimulus', n_resamples=10000, confidence=0.95,
+                    seed=0, n_workers=None, chunk_size=500):
+    """Bootstrap confidence intervals of hit rate and ignore rate per row, and of d' per group of keys.
+
+    hr_table has one row per group and stimulus with the trial counts in the columns OUTCOMES. d' is
+    computed for the groups with exactly two stimuli (in alphabetical order). Returns two tables:
+    the rates per row and d' per group, each with the point estimate and the interval bounds.
+    """
+    keys = list(keys)
+    table = hr_table.sort_values(keys + [stimulus]).reset_index(drop=True)
+    counts = table[list(OUTCOMES)].to_numpy(dtype=np.int64)
+
+    # Rows of the two stimuli of every group
+    positions = table.groupby(keys, sort=True).indices
+    pairs = [(label, rows) for label, rows in positions.items() if len(rows) == 2]
+    pair_A = np.array([rows[0] for label, rows in pairs], dtype=np.int64)
+    pair_B = np.array([rows[1] for label, rows in pairs], dtype=np.int64)
+
+    # Fixed chunks with their own seeds: the result is the same for any number of processes
+    sizes = [min(chunk_size, n_resamples - start) for start in range(0, n_resamples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    arguments = [(counts, pair_A, pair_B, size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+
+    if n_workers == 1:
+        chunks = [_bootstrap_chunk(*chunk_arguments) for chunk_arguments in arguments]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            chunks = list(executor.map(_bootstrap_chunk, *zip(*arguments)))
+
+    hit_rate, ignore_rate, dprime = [np.concatenate(values) for values in zip(*chunks)]
+    quantiles = [(1 - confidence) / 2, (1 + confidence) / 2]
+
+    n_trials = counts.sum(axis=1)
+    rates = table[keys + [stimulus]].copy()
+    rates['N'] = n_trials
+    rates['hits'] = counts[:, 0] / n_trials
+    rates['hits_low'], rates['hits_high'] = np.nanquantile(hit_rate, quantiles, axis=0)
+    rates['ignored'] = counts[:, 2] / n_trials
+    rates['ignored_low'], rates['ignored_high'] = np.nanquantile(ignore_rate, quantiles, axis=0)
+
+    dprimes = pd.DataFrame([label if isinstance(label, tuple) else (label,) for label, rows in pairs], columns=keys)
+    dprimes['stimulus_A'] = table[stimulus].to_numpy()[pair_A]
+    dprimes['stimulus_B'] = table[stimulus].to_numpy()[pair_B]
+    dprimes['dprime'] = dPrime_2AFC(counts[pair_A][:, :2], counts[pair_B][:, 1::-1])
+    dprimes['dprime_low'], dprimes['dprime_high'] = np.quantile(dprime, quantiles, axis=0)
+
+    return rates, dprimes
+
+
+if __name__ == '__main__':
+    from data_schema import load_table
+
+    n_resamples = 10000
+    for name in ['Figure_3C_HR.csv', 'Figure_4C_HR.csv']:
+        HR = load_table('./data/' + name)
+
+        start = time.perf_counter()
+        rates, dprimes = bootstrap_rates(HR, n_resamples=n_resamples)
+        elapsed = time.perf_counter() - start
+
+        print(dprimes.round(2).to_string(index=False))
+        print("{}: {} rows x {} resamples in {:.2f} s".format(name, len(HR), n_resamples, elapsed))
+
+    # The same resampling with one pandas draw per row and resample, for a few resamples
+    HR = load_table('./data/Figure_3C_HR.csv')
+    trials = [pd.DataFrame({'outcome': np.repeat(OUTCOMES, row[list(OUTCOMES)].to_numpy(dtype=int))})
+              for _, row in HR.iterrows()]
+    n_loop = 20
+    start = time.perf_counter()
+    for i in range(n_loop):
+        for df in trials:
+            resample = df.sample(frac=1, replace=True, random_state=i)
+            resample['outcome'].value_counts(normalize=True)
+    loop_time = (time.perf_counter() - start) / n_loop * n_resamples
+    print("pandas loop: about {:.0f} s for {} resamples".format(loop_time, n_resamples))
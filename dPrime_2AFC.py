@@ -24,7 +24,10 @@ February 2022
 # hit_rate = (54 + 48)/ sum({all trials})
 # dp here is equal to sqrt(2)*z(hit_rate)
 
-from numpy import array, sqrt, exp, sum, ndarray, atleast_2d
+from numpy import (array, sqrt, exp, sum, ndarray, atleast_2d, where, bincount, errstate, linspace, interp,
+                   sign, maximum, minimum, isfinite, inf, nan, pi, concatenate)
+import pandas as pd
+from scipy.special import ndtr
 from scipy.stats import norm
 
 Z = norm.ppf
@@ -48,8 +51,8 @@ def dPrime_2AFC(resp_A, resp_B):
     hit_rate = resp_A[:, 0] / n_trials
 
     # Correct hit_rate to avoid d' infinity
-    hit_rate[hit_rate == 0] = half_resp[hit_rate == 0]
-    hit_rate[hit_rate == 1] = 1 - half_resp[hit_rate == 0]
+    hit_rate = where(hit_rate == 0, half_resp, hit_rate)
+    hit_rate = where(hit_rate == 1, 1 - half_resp, hit_rate)
 
     # Floors and ceilings are replaced by half hits and half FA's
     n_trials = sum(resp_B, axis=1)
@@ -58,8 +61,8 @@ def dPrime_2AFC(resp_A, resp_B):
     fa_rate = resp_B[:, 0] / n_trials
 
     # Correct false alarm rate to avoid d' infinity
-    fa_rate[hit_rate == 0] = half_resp[fa_rate == 0]
-    fa_rate[hit_rate == 1] = 1 - half_resp[fa_rate == 0]
+    fa_rate = where(fa_rate == 0, half_resp, fa_rate)
+    fa_rate = where(fa_rate == 1, 1 - half_resp, fa_rate)
 
     # Return d'
     dPrime = 1 / sqrt(2) * (Z(hit_rate) - Z(fa_rate))  # Macmillan's suggest penalization for 2FAC (easy task)
@@ -68,13 +71,101 @@ def dPrime_2AFC(resp_A, resp_B):
     return dPrime
 
 
-def dPrime_XAB_IndMod(hit_rate, fa_rate):
-    
+def response_counts(responses, keys, stimulus='stimulus', choice='selection'):
+    """Count the trials of a trial-level table per group, stimulus and choice.
+
+    Ignored trials (no choice) are not counted. The result is the long-format input of dPrime_2AFC_batch.
+    """
+    keys = list(keys)
+    chosen = responses[responses[choice].notna()]
+    counts = chosen.groupby(keys + [stimulus, choice], observed=True, sort=True).size()
+
+    return counts.rename('count').reset_index()
+
+
+def dPrime_2AFC_batch(counts, keys, stimulus='stimulus', choice='selection', count='count'):
+    """Compute corrected hit rate, false alarm rate and d' for every group of a long-format counts table.
+
+    Each group (e.g. monkey x task, or monkey x task x session) holds the number of trials for each
+    combination of its two stimuli and the two choices. The stimulus that comes first alphabetically
+    is taken as target (A); the d' of a 2AFC task does not depend on this choice. The stimuli shown
+    and chosen in a group must be at most two; a group where only one of them was shown has no d' (NaN).
+    """
+    keys = list(keys)
+    stimuli = counts[stimulus].astype(str).to_numpy()
+    choices = counts[choice].astype(str).to_numpy()
+
+    # Number every group and find its two stimuli, among the stimuli shown and chosen in the group
+    grouped = counts.groupby(keys, observed=True, sort=True)
+    group_id = grouped.ngroup().to_numpy()
+    groups = grouped.size().index
+    n_groups = len(groups)
+
+    per_group = pd.Series(concatenate([stimuli, choices])).groupby(concatenate([group_id, group_id]))
+    if (per_group.nunique() > 2).any():
+        raise ValueError("dPrime_2AFC_batch needs at most two stimuli (shown or chosen) per group")
+    stimulus_A = per_group.min().reindex(range(n_groups)).to_numpy()
+    stimulus_B = per_group.max().reindex(range(n_groups)).to_numpy()
+
+    # Sum all counts into a (group, stimulus, choice) array in one pass
+    presented_B = stimuli != stimulus_A[group_id]
+    chose_B = choices != stimulus_A[group_id]
+    cells = group_id * 4 + presented_B * 2 + chose_B
+    n = bincount(cells, weights=counts[count].to_numpy(dtype=float), minlength=n_groups * 4).reshape(n_groups, 2, 2)
+
+    # Floors and ceilings are replaced by half hits and half FA's
+    with errstate(divide='ignore', invalid='ignore'):
+        n_trials = n.sum(axis=2)
+        half_resp = 0.5 / n_trials
+        rates = n[:, :, 0] / n_trials
+
+    rates = where(rates == 0, half_resp, rates)
+    rates = where(rates == 1, 1 - half_resp, rates)
+
+    result = groups.to_frame(index=False)
+    result['stimulus_A'] = stimulus_A
+    result['stimulus_B'] = stimulus_B
+    result['hit_rate'] = rates[:, 0]
+    result['fa_rate'] = rates[:, 1]
+    result['trials'] = n_trials.sum(axis=1)
+    result['dprime'] = 1 / sqrt(2) * (Z(rates[:, 0]) - Z(rates[:, 1]))
+
+    return result
+
+
+def PC_XAB_IndMod(dPrime):
+    """Proportion correct of an unbiased observer in 2AFC match-to-sample (independent observation model).
+
+    Same as PAL_SDT_2AFCmatchSample_IndMod_DPtoPC; PC rises from 0.5 at d' = 0 towards 1.
+    """
+    # ndtr is the standard normal cdf without the overhead of scipy.stats
+    return ndtr(dPrime / sqrt(2)) * ndtr(dPrime / 2) + ndtr(-dPrime / sqrt(2)) * ndtr(-dPrime / 2)
+
+
+def _dPC_XAB_IndMod(dPrime):
+    # Derivative of PC_XAB_IndMod with respect to d'
+    return (exp(-dPrime ** 2 / 4) / sqrt(4 * pi) * (ndtr(dPrime / 2) - ndtr(-dPrime / 2)) +
+            exp(-dPrime ** 2 / 8) / sqrt(8 * pi) * (ndtr(dPrime / sqrt(2)) - ndtr(-dPrime / sqrt(2))))
+
+
+# Monotone lookup table of PC(d') used as starting point of the inversion
+_dP_table = linspace(0, 12, 4097)
+_PC_table = PC_XAB_IndMod(_dP_table)
+
+
+def dPrime_XAB_IndMod(hit_rate, fa_rate, newton_steps=3):
+    """Compute d' and criterion of 2AFC match-to-sample from hit and false alarm rates (independent observation model).
+
+    Works on whole arrays of (hit, FA) pairs: the maximum proportion correct of every pair is inverted
+    through the lookup table above, followed by a few vectorized Newton steps. This replaces the
+    PAL_minimize loop of Palamedes' PAL_SDT_2AFCmatchSample_IndMod_PHFtoDP.
+    Pairs performing below chance get the negative d' of the mirrored proportion correct.
+    """
     if not isinstance(hit_rate, ndarray):
-        hit_rate = array(hit_rate)
+        hit_rate = array(hit_rate, dtype=float)
 
     if not isinstance(fa_rate, ndarray):
-        fa_rate = array(fa_rate)
+        fa_rate = array(fa_rate, dtype=float)
 
     zH = Z(hit_rate) # PAL_PtoZ(pHF(:,1));
     zF = Z(fa_rate)  # PAL_PtoZ(pHF(:,2));
@@ -84,18 +175,23 @@ def dPrime_XAB_IndMod(hit_rate, fa_rate):
     zDiff = (zH-zF)/2
 
     PCmax = ZtoP(zDiff) # PCmax = PAL_ZtoP(zDiff)
-    
-    # func = @PAL_SDT_2AFCmatchSample_IndMod_DPtoPC
-    
-    # dP = zeros(rows,1);
-    
-    # for r=1:rows
-    #     dP(r)=PAL_minimize(@PAL_sqDistanceYfuncX,1,[],PCmax(r),func,[]);
-    # end
-    
+
+    # PC(d') is symmetric around d' = 0, so invert the above-chance side and restore the sign afterwards
+    target = maximum(PCmax, 1 - PCmax)
+    dPrime = interp(target, _PC_table, _dP_table)
+
+    # Newton steps, kept inside the range of the table; where the slope vanishes (d' = 0) the start is exact
+    for _ in range(newton_steps):
+        slope = _dPC_XAB_IndMod(dPrime)
+        with errstate(divide='ignore', invalid='ignore'):
+            step = where(slope > 0, (PC_XAB_IndMod(dPrime) - target) / slope, 0)
+        dPrime = minimum(maximum(dPrime - step, 0), _dP_table[-1])
+
+    # Perfect performance has no finite d'
+    dPrime = where(target >= 1, inf, dPrime)
+    dPrime = where(isfinite(zDiff) | (target >= 1), sign(zDiff) * dPrime, nan)
+
     return dPrime, C
-    
-    
 
 
 if __name__ == '__main__':
@@ -112,4 +208,32 @@ if __name__ == '__main__':
 
     dPrime = dPrime_2AFC(testA, testB)
 
-    print(f"dPrime = {dPrime}")
\ No newline at end of file
+    print(f"dPrime = {dPrime}")
+
+    # Match-to-sample d' for a grid of (hit, FA) pairs, as needed for every animal x task x session
+    import time
+
+    grid = linspace(0.01, 0.99, 1000)
+    hits = (grid[:, None] + 0 * grid[None, :]).ravel()
+    fas = (0 * grid[:, None] + grid[None, :]).ravel()
+
+    start = time.perf_counter()
+    dP_XAB, C_XAB = dPrime_XAB_IndMod(hits, fas)
+    elapsed = time.perf_counter() - start
+
+    error = abs(PC_XAB_IndMod(dP_XAB) - ZtoP(abs(Z(hits) - Z(fas)) / 2)).max()
+    print(f"{len(hits)} match-to-sample d' values in {elapsed * 1000:.1f} ms, max PC error {error:.1e}")
+
+    # Regenerate the d' tables of Figure 3C per animal and per session from the trial-level responses
+    from data_schema import load_table
+
+    Responses = load_table('./data/Figure_3D_Responses.csv')
+
+    start = time.perf_counter()
+    dP_animal = dPrime_2AFC_batch(response_counts(Responses, ['monkey', 'task']), ['monkey', 'task'])
+    dP_session = dPrime_2AFC_batch(response_counts(Responses, ['monkey', 'task', 'session']),
+                                   ['monkey', 'task', 'session'])
+    elapsed = time.perf_counter() - start
+
+    print(dP_animal[['monkey', 'task', 'trials', 'dprime']].round(2))
+    print(f"{len(dP_animal)} animal and {len(dP_session)} session d' values in {elapsed * 1000:.1f} ms")
\ No newline at end of file
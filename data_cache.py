@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar on-disk cache for the curated data files loaded by the figure scripts.
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+The first time a csv file is read it is parsed with pandas and every column is stored as a
+separate .npy file in "./data/.cache". Later reads load the columns back from disk instead of
+parsing the csv again. The cache of a file is rebuilt when its content changes: the modification
+time and size are checked first and, if they differ, the content hash decides whether the file
+really changed.
+
+Running this file benchmarks cold (csv) against warm (cache) loading for all files in "./data".
+
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+cache_path = './data/.cache'
+
+CACHE_VERSION = 1
+
+
+def file_hash(filename, chunk_size=1 << 20):
+    # Hash the content of a file without loading it into memory at once
+    digest = hashlib.sha1()
+    with open(filename, 'rb') as file_object:
+        for chunk in iter(lambda: file_object.read(chunk_size), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _options_key(read_options):
+    # Files read with different parser options are cached separately
+    text = json.dumps(read_options, sort_keys=True, default=str)
+
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+def _cache_dir(filename, read_options):
+    name = os.path.splitext(os.path.basename(filename))[0]
+
+    return os.path.join(cache_path, "{}.{}".format(name, _options_key(read_options)))
+
+
+def _save_column(column_dir, i, series):
+    # Numeric and boolean columns are stored as they are; everything else is stored as integer
+    # codes plus a table of unique values, with -1 marking missing entries
+    if series.dtype.kind in 'biufcmM':
+        np.save(os.path.join(column_dir, "col_{}.npy".format(i)), series.to_numpy(), allow_pickle=False)
+        return 'values'
+
+    categorical = pd.Categorical(series)
+    categories = np.asarray(categorical.categories, dtype=object)
+    if all(isinstance(c, str) for c in categories):
+        categories = categories.astype(str)
+
+    np.save(os.path.join(column_dir, "col_{}_codes.npy".format(i)), categorical.codes, allow_pickle=False)
+    np.save(os.path.join(column_dir, "col_{}_categories.npy".format(i)), categories,
+            allow_pickle=categories.dtype == object)
+
+    return 'codes'
+
+
+def _load_column(column_dir, i, column):
+    if column['storage'] == 'values':
+        return np.load(os.path.join(column_dir, "col_{}.npy".format(i)))
+
+    codes = np.load(os.path.join(column_dir, "col_{}_codes.npy".format(i)))
+    categories = np.load(os.path.join(column_dir, "col_{}_categories.npy".format(i)), allow_pickle=True)
+
+    if column['dtype'] == 'category':
+        return pd.Categorical.from_codes(codes, categories=categories)
+
+    # Restore the original column, with missing entries as NaN
+    values = np.full(len(codes), np.nan, dtype=object)
+    valid = codes >= 0
+    values[valid] = categories.astype(object)[codes[valid]]
+
+    return values
+
+
+def _write_cache(filename, read_options, df, source):
+    target = _cache_dir(filename, read_options)
+    os.makedirs(cache_path, exist_ok=True)
+
+    # Write the columns into a temporary folder first, so that an interrupted run never leaves a
+    # half written cache behind
+    column_dir = tempfile.mkdtemp(dir=cache_path)
+    columns = []
+    for i, name in enumerate(df.columns):
+        storage = _save_column(column_dir, i, df[name])
+        columns.append({'name': name, 'dtype': str(df[name].dtype), 'storage': storage})
+
+    meta = {'version': CACHE_VERSION, 'source': source, 'rows': len(df), 'columns': columns}
+    with open(os.path.join(column_dir, 'meta.json'), 'w') as file_object:
+        json.dump(meta, file_object, indent=1, default=str)
+
+    shutil.rmtree(target, ignore_errors=True)
+    try:
+        os.replace(column_dir, target)
+    except OSError:
+        # Another process (e.g. a figure script running at the same time) wrote the same cache first
+        shutil.rmtree(column_dir, ignore_errors=True)
+
+
+def _read_meta(target):
+    try:
+        with open(os.path.join(target, 'meta.json')) as file_object:
+            meta = json.load(file_object)
+    except (OSError, ValueError):
+        return None
+
+    if meta.get('version') != CACHE_VERSION:
+        return None
+
+    return meta
+
+
+def source_info(filename, with_hash=False):
+    stat = os.stat(filename)
+    source = {'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+    if with_hash:
+        source['hash'] = file_hash(filename)
+
+    return source
+
+
+def source_unchanged(filename, recorded):
+    """Check whether a file still matches the source information recorded with a cache.
+
+    The recorded modification time is updated when the file was touched without changing its content.
+    """
+    source = source_info(filename)
+
+    # Same modification time and size: the file was not touched since the cache was written
+    if recorded['mtime'] == source['mtime'] and recorded['size'] == source['size']:
+        return True
+
+    # The file was touched; keep the cache only if its content did not change
+    if recorded['size'] == source['size'] and recorded['hash'] == file_hash(filename):
+        recorded['mtime'] = source['mtime']
+        return True
+
+    return False
+
+
+def load_csv(filename, use_cache=True, **read_options):
+    """Read a csv file like pd.read_csv, serving repeated reads from the columnar cache.
+
+    The keyword arguments are passed to pd.read_csv and are part of the cache key.
+    """
+    if not use_cache:
+        return pd.read_csv(filename, **read_options)
+
+    target = _cache_dir(filename, read_options)
+    meta = _read_meta(target)
+
+    recorded_mtime = meta['source']['mtime'] if meta is not None else None
+    if meta is not None and source_unchanged(filename, meta['source']):
+        if meta['source']['mtime'] != recorded_mtime:
+            with open(os.path.join(target, 'meta.json'), 'w') as file_object:
+                json.dump(meta, file_object, indent=1, default=str)
+
+        data = {}
+        for i, column in enumerate(meta['columns']):
+            data[column['name']] = _load_column(target, i, column)
+
+        return pd.DataFrame(data, columns=[column['name'] for column in meta['columns']])
+
+    df = pd.read_csv(filename, **read_options)
+    _write_cache(filename, read_options, df, source_info(filename, with_hash=True))
+
+    return df
+
+
+def clear_cache():
+    shutil.rmtree(cache_path, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    # Benchmark cold (csv parsing) against warm (cache) loading for all curated data files
+    data_path = './data/'
+
+    print("{:<32}{:>10}{:>12}{:>12}{:>10}".format('file', 'rows', 'cold [ms]', 'warm [ms]', 'speedup'))
+    for name in sorted(os.listdir(data_path)):
+        if not name.endswith('.csv'):
+            continue
+        filename = os.path.join(data_path, name)
+        sep = ';' if ';' in open(filename).readline() else ','
+
+        shutil.rmtree(_cache_dir(filename, {'sep': sep, 'low_memory': False}), ignore_errors=True)
+        start = time.perf_counter()
+        df = load_csv(filename, sep=sep, low_memory=False)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        load_csv(filename, sep=sep, low_memory=False)
+        warm = time.perf_counter() - start
+
+        print("{:<32}{:>10}{:>12.1f}{:>12.1f}{:>10.1f}".format(name, len(df), cold * 1000, warm * 1000, cold / warm))
+
+    # A synthetic trial table of the size expected for the full cohort
+    n_rows = 2000000
+    rng = np.random.default_rng(0)
+    synthetic = pd.DataFrame({'RT': rng.gamma(2, 1, n_rows).round(3),
+                              'monkey': rng.choice(list('abcdefghijklmn'), n_rows),
+                              'outcome': rng.choice(['correct', 'wrong', 'ignored'], n_rows),
+                              'session': rng.integers(1, 300, n_rows).astype(float),
+                              'stimulus': rng.choice(['str', 'voc'], n_rows),
+                              'task': rng.choice(['2 Visual Stimuli', '3 Visual Stimuli'], n_rows)})
+    filename = os.path.join(tempfile.mkdtemp(), 'synthetic_Responses.csv')
+    synthetic.to_csv(filename, sep=';', index=False)
+
+    start = time.perf_counter()
+    load_csv(filename, sep=';', low_memory=False)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    load_csv(filename, sep=';', low_memory=False)
+    warm = time.perf_counter() - start
+
+    print("{:<32}{:>10}{:>12.1f}{:>12.1f}{:>10.1f}".format('synthetic_Responses.csv', n_rows, cold * 1000,
+                                                             warm * 1000, cold / warm))
+    shutil.rmtree(os.path.dirname(filename))
+    shutil.rmtree(_cache_dir(filename, {'sep': ';', 'low_memory': False}))
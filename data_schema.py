@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Schema registry of the curated data files in the folder "./data".
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+For each file the registry records the separator, the decimal mark and the type of every column,
+so that the columns are parsed directly into their final type and no conversion is needed after
+loading. Narrow integer types and categorical columns are used for the trial-level tables, where
+they reduce memory the most. Columns that end up in the output tables keep the types the figure
+scripts have always used, so the saved tables do not change.
+
+Running this file compares parse time and memory of the schema against pandas' type inference.
+
+"""
+
+import os
+import time
+import tracemalloc
+
+import pandas as pd
+
+from data_cache import load_csv
+
+SCHEMAS = {
+    'Animals_metaData.csv': {
+        'sep': ';', 'decimal': '.',
+        'dtype': {'monkey': 'object', 'palette_r': 'float64', 'palette_g': 'float64', 'palette_b': 'float64',
+                  'ID': 'object', 'Sex': 'object', 'Age': 'int16', 'Weight': 'object', 'Hab.': 'object',
+                  'Mou.': 'object', 'Tou.': 'object'}},
+
+    'Figure_1.csv': {
+        'sep': ';', 'decimal': '.', 'low_memory': False,
+        'dtype': {'animal': 'object', 'crashed': 'float64',
+                  'switched': 'float64', 'trials': 'float64', 'duration': 'float64', 'session': 'float64',
+                  'medianTimes': 'float64', 'times': 'object'}},
+
+    'Figure_2_AUTdf.csv': {
+        'sep': ',', 'decimal': '.',
+        'dtype': {'animal': 'object', 'hitrate': 'float64', 'milestone': 'object', 'trials': 'int16',
+                  'total_trials': 'int32', 'sessions': 'int32', 'reward': 'int32', 'step': 'float64'}},
+
+    'Figure_2_correctedDF.csv': {
+        'sep': ',', 'decimal': '.',
+        'dtype': {'trial': 'int32', 'step': 'int32', 'objtype': 'category', 'object': 'category',
+                  'objflag': 'category', 'action': 'object', 'stimusize': 'int16', 'stimposx': 'float32',
+                  'stimposy': 'float32', 'touchposx': 'int16', 'touchposy': 'int16', 'monkey': 'object',
+                  'timestamp': 'int64', 'tone': 'int16', 'date': 'object', 'weight': 'int16',
+                  'disName': 'float32', 'disCoor': 'float32', 'sessionNumber': 'int16', 'mxbi': 'category',
+                  'version': 'int16', 'animalsFound': 'category', 'sessionType': 'category',
+                  'animalsMerged': 'float32', 'filename': 'category', 'script': 'category',
+                  'experiment': 'category', 'task': 'category', 'type': 'category', 'stimuli': 'float32',
+                  'amp': 'float32', 'stimTouched': 'category', 'reward': 'object', 'tarName': 'category',
+                  'animalsExpected': 'category', 'shift': 'float32', 'jump': 'bool', 'total_trials': 'int32',
+                  'p_trial': 'float64'}},
+
+    'Figure_3AB.csv': {
+        'sep': ',', 'decimal': '.',
+        'dtype': {'monkey': 'object', 'HitRate': 'float64', 'p_trials': 'int64', 'Trials': 'int64',
+                  'stimulus': 'object', 'sessionType': 'object', 'date': 'object'}},
+
+    'Figure_3C_HR.csv': {
+        'sep': ';', 'decimal': '.',
+        'dtype': {'N': 'float64', 'bin_DF': 'float64', 'bin_N': 'float64', 'binomial': 'float64',
+                  'hits': 'float64', 'hits_n': 'float64', 'ignored': 'float64', 'ignored_n': 'float64',
+                  'monkey': 'object', 'stimulus': 'object', 'task': 'object', 'wrong': 'float64',
+                  'wrong_n': 'float64', 'adjusted_p': 'float64'}},
+
+    'Figure_3C_dPDF.csv': {
+        'sep': ';', 'decimal': '.',
+        'dtype': {'monkey': 'object', 'task': 'object', 'dprime': 'float64', 'trials': 'float64'}},
+
+    'Figure_3D_Responses.csv': {
+        'sep': ';', 'decimal': '.',
+        'dtype': {'RT': 'float64', 'monkey': 'category', 'outcome': 'category', 'selection': 'category',
+                  'session': 'int16', 'stimulus': 'category', 'task': 'category', 'trials': 'int32'}},
+
+    'Figure_4B.csv': {
+        'sep': ';', 'decimal': '.',
+        'dtype': {'animal': 'object', 'HitRate': 'float64', 'p_trials': 'int64', 'Trials': 'int64',
+                  'stimulus': 'object', 'task': 'object', 'date': 'object'}},
+
+    'Figure_4C_HR.csv': {
+        'sep': ';', 'decimal': '.',
+        'dtype': {'N': 'float64', 'bin_DF': 'float64', 'bin_N': 'float64', 'binomial': 'float64',
+                  'hits': 'float64', 'hits_n': 'float64', 'ignored': 'float64', 'ignored_n': 'float64',
+                  'monkey': 'object', 'stimulus': 'object', 'task': 'object', 'wrong': 'float64',
+                  'wrong_n': 'float64', 'adjusted_p': 'float64'}},
+
+    'Figure_4C_Responses.csv': {
+        'sep': ';', 'decimal': '.',
+        'dtype': {'monkey': 'category', 'task': 'category', 'trial': 'int32', 'stimulus': 'category',
+                  'selection': 'category', 'RT': 'float64', 'outcome': 'category'}},
+
+    'Figure_4C_dPDF.csv': {
+        'sep': ';', 'decimal': '.',
+        'dtype': {'monkey': 'object', 'task': 'object', 'dprime': 'float64', 'trials': 'float64'}},
+
+    'Figure_5.csv': {
+        'sep': ';', 'decimal': ',',
+        'dtype': {'animal': 'object', 'session': 'int16', 'stimulus': 'object', 'level': 'int16',
+                  'total': 'float64', 'hits': 'float64'}},
+
+    'Figure_S1_ABS.csv': {
+        'sep': ';', 'decimal': ',',
+        'dtype': {'monkey': 'object', 'stimulus': 'object', 'count': 'float64', 'task': 'object',
+                  'outcome': 'object'}},
+
+    'Figure_S1_HR.csv': {
+        'sep': ';', 'decimal': ',',
+        'dtype': {'monkey': 'object', 'N': 'float64', 'task': 'object', 'hits': 'float64', 'ignored': 'float64',
+                  'wrong': 'float64', 'stimulus': 'object', 'hits_n': 'float64', 'ignored_n': 'float64',
+                  'wrong_n': 'float64', 'bin_N': 'float64', 'bin_DF': 'float64', 'binomial': 'float64',
+                  'adjusted_p': 'float64'}},
+
+    'Figure_S1_dPDF.csv': {
+        'sep': ';', 'decimal': ',',
+        'dtype': {'monkey': 'object', 'task': 'object', 'dprime': 'float64', 'trials': 'object'}},
+
+    'Figure_S1_data.csv': {
+        'sep': ';', 'decimal': ',',
+        'dtype': {'monkey': 'category', 'task': 'category', 'reactionTime': 'float64', 'outcome': 'category',
+                  'stimulus': 'category', 'my_col': 'float64'}},
+
+    'Figure_S1_plot.csv': {
+        'sep': ';', 'decimal': ',',
+        'dtype': {'monkey': 'object', 'p_trials': 'int64', 'Trials': 'int64', 'HitRate': 'float64'}},
+
+    'Figure_S2BD_data.csv': {
+        'sep': ',', 'decimal': '.',
+        'dtype': {'session': 'int16', 'animal': 'object', 'trials': 'int32', 'hits': 'int32', 'fa': 'int32',
+                  'ign': 'int32', 'hr': 'float64', 'er': 'float64', 'oddsRatio': 'float64', 'pVal': 'float64',
+                  'sDur': 'object', 'maxStep': 'int16', 'minStep': 'int16',
+                  'voc': 'int32', 'vocHit': 'int32', 'vocFA': 'int32', 'vocIgn': 'int32', 'vocHR': 'float64',
+                  'vocER': 'float64',
+                  'sTr': 'int32', 'sTrHit': 'int32', 'sTrFA': 'int32', 'sTrIgn': 'int32', 'sTrHR': 'float64',
+                  'sTrER': 'float64',
+                  'cTr': 'int32', 'cTrHit': 'int32', 'cTrFA': 'int32', 'cTrIgn': 'int32', 'cTrHR': 'float64',
+                  'cTrER': 'float64'}},
+
+    'Figure_S2C_data.csv': {
+        'sep': ',', 'decimal': '.',
+        'dtype': {'ntrial': 'int32', 'step': 'int16'}},
+
+    'Figure_S3_ITI_summary.csv': {
+        'sep': ';', 'decimal': '.',
+        'dtype': {'animal': 'object', 'outcome': 'object', 'ITI mean': 'float64', 'ITI std': 'float64',
+                  'likelihood': 'float64'}},
+
+    'Figure_S3_ITI_times.csv': {
+        'sep': ';', 'decimal': '.',
+        'dtype': {'ITI': 'int32', 'Outcome': 'category', 'animal': 'category'}},
+
+    'PSD_data.csv': {
+        'sep': ',', 'decimal': '.',
+        'dtype': {'power': 'float64', 'freq': 'float64'}},
+}
+
+
+def load_table(filename, use_cache=True):
+    """Load a curated data file with the separator, decimal mark and column types of its schema."""
+    name = os.path.basename(filename)
+    if name not in SCHEMAS:
+        raise KeyError("No schema registered for data file '{}'".format(name))
+
+    return load_csv(filename, use_cache=use_cache, **SCHEMAS[name])
+
+
+if __name__ == '__main__':
+    # Compare parsing with the schema against type inference followed by conversion, without cache
+    data_path = './data/'
+
+    print("{:<32}{:>14}{:>14}{:>14}{:>14}".format('file', 'infer [ms]', 'schema [ms]', 'infer [MB]', 'schema [MB]'))
+    for name in sorted(SCHEMAS):
+        filename = os.path.join(data_path, name)
+        if not os.path.exists(filename):
+            continue
+
+        results = []
+        for options in [{'sep': SCHEMAS[name]['sep'], 'decimal': SCHEMAS[name]['decimal'], 'low_memory': False},
+                        SCHEMAS[name]]:
+            tracemalloc.start()
+            start = time.perf_counter()
+            df = pd.read_csv(filename, **options)
+            if 'dtype' not in options:
+                df = df.astype(SCHEMAS[name]['dtype'])
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results.append((elapsed, peak))
+
+        print("{:<32}{:>14.1f}{:>14.1f}{:>14.2f}{:>14.2f}".format(name, results[0][0] * 1000, results[1][0] * 1000,
+                                                                    results[0][1] / 1e6, results[1][1] / 1e6))
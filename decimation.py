@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Waveform decimation for plotting: per-column minimum, maximum and RMS envelopes.
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+A waveform drawn into an axes a few hundred pixels wide cannot show more than the lowest and the
+highest sample of every pixel column. The signal is cut into as many blocks of equal length as
+there are columns, viewed as a (columns x block) array and reduced along the rows in one pass
+(minimum, maximum and, optionally, root mean square). The band between minimum and maximum looks
+like the line through all samples, but drawing it and the size of a vector file depend only on the
+width of the figure. Long (memory-mapped) recordings are reduced a chunk of rows at a time, so
+only the chunk is held in memory.
+
+Running this file decimates a synthetic one-hour 48 kHz recording and compares drawing and saving
+it with plotting the raw samples.
+
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+
+
+def envelope(signal, n_columns, rms=False, chunk_samples=1 << 22):
+    """Minimum and maximum (and RMS) of the signal in at most n_columns blocks of equal length.
+
+    Returns the first sample of every block, the minima, the maxima and, with rms=True, the root mean
+    square of every block. The last block holds the remaining samples and can be shorter. An empty
+    signal has no block.
+    """
+    n_samples = len(signal)
+    if n_samples == 0:
+        empty = np.asarray(signal[:0])
+        reduced = (np.zeros(0, dtype=np.int64), empty.copy(), empty.copy())
+        return reduced + (np.zeros(0),) if rms else reduced
+
+    block = max(1, -(-n_samples // n_columns))
+    n_full = n_samples // block
+    rows_per_chunk = max(1, chunk_samples // block)
+
+    minima, maxima, power = [], [], []
+
+    def reduce(rows):
+        minima.append(rows.min(axis=1))
+        maxima.append(rows.max(axis=1))
+        if rms:
+            rows = rows.astype(np.float64)
+            power.append(np.einsum('ij,ij->i', rows, rows) / rows.shape[1])
+
+    full = signal[:n_full * block].reshape(n_full, block)
+    for first in range(0, n_full, rows_per_chunk):
+        reduce(np.asarray(full[first:first + rows_per_chunk]))
+    if n_full * block < n_samples:
+        reduce(np.asarray(signal[n_full * block:]).reshape(1, -1))
+
+    minima, maxima = np.concatenate(minima), np.concatenate(maxima)
+    positions = np.arange(len(minima)) * block
+    if rms:
+        return positions, minima, maxima, np.sqrt(np.concatenate(power))
+
+    return positions, minima, maxima
+
+
+def axes_columns(ax, oversample=2):
+    """Width of an axes in pixels at the figure resolution, times oversample (to allow zooming in a pdf)."""
+    figure = ax.get_figure()
+
+    return max(1, int(np.ceil(ax.get_position().width * figure.get_figwidth() * figure.dpi * oversample)))
+
+
+def plot_envelope(ax, signal, n_columns=None, rms=False, **kwargs):
+    """Draw a waveform (x in samples, as plot(signal)) as its min/max band, with the RMS band inside it.
+
+    The number of columns defaults to the pixel width of the axes.
+    """
+    kwargs.setdefault('color', 'C0')
+    kwargs.setdefault('linewidth', 0.5)
+    if n_columns is None:
+        n_columns = axes_columns(ax)
+
+    reduced = envelope(signal, n_columns, rms=rms)
+    artists = [ax.fill_between(reduced[0], reduced[1], reduced[2], **kwargs)]
+    if rms:
+        kwargs['alpha'] = 0.5 * kwargs.get('alpha', 1)
+        artists.append(ax.fill_between(reduced[0], -reduced[3], reduced[3], **dict(kwargs, color='k')))
+
+    return artists
+
+
+if __name__ == '__main__':
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    # One hour of colony noise at 48 kHz with a call every minute
+    rng = np.random.default_rng(0)
+    fs = 48000
+    hour = rng.normal(0, 1000, fs * 3600).astype(np.int16)
+    calls = np.arange(30, 3600, 60) * fs
+    for call in calls:
+        hour[call:call + fs] += (8000 * np.sin(np.arange(fs) / 5)).astype(np.int16)
+
+    start = time.perf_counter()
+    positions, minima, maxima, rms = envelope(hour, 2000, rms=True)
+    reduce_time = time.perf_counter() - start
+
+    # Same values as reducing the samples of every block separately
+    block = positions[1]
+    blocks = [hour[i * block:(i + 1) * block] for i in range(0, len(positions), 97)]
+    assert np.array_equal(minima[::97], [b.min() for b in blocks])
+    assert np.array_equal(maxima[::97], [b.max() for b in blocks])
+    assert np.allclose(rms[5], np.sqrt(np.mean(hour[5 * block:6 * block].astype(float) ** 2)))
+
+    directory = tempfile.mkdtemp()
+
+    def draw(signal, decimated):
+        f, ax = plt.subplots(figsize=(180 / 25.4, 60 / 25.4))
+        start = time.perf_counter()
+        if decimated:
+            plot_envelope(ax, signal)
+        else:
+            ax.plot(signal)
+        filename = os.path.join(directory, 'waveform.pdf')
+        f.savefig(filename, format='pdf')
+        elapsed = time.perf_counter() - start
+        plt.close(f)
+        size = os.path.getsize(filename)
+        os.remove(filename)
+
+        return elapsed, size
+
+    # Plotting the raw samples of the whole hour takes too long; one and ten minutes show how it scales
+    print("envelope of {} samples: {:.0f} ms".format(len(hour), reduce_time * 1000))
+    print("{:<12}{:>16}{:>14}{:>18}{:>14}".format('length', 'raw [ms]', 'raw [kB]', 'envelope [ms]', 'envelope [kB]'))
+    for minutes in [1, 10, 60]:
+        signal = hour[:minutes * 60 * fs]
+        raw = draw(signal, False) if minutes <= 10 else (np.nan, np.nan)
+        decimated = draw(signal, True)
+        print("{:<12}{:>16.0f}{:>14.0f}{:>18.0f}{:>14.0f}".format(
+            '{} min'.format(minutes), raw[0] * 1000, raw[1] / 1000, decimated[0] * 1000, decimated[1] / 1000))
+
+    os.rmdir(directory)
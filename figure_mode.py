@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Start-up mode of the figure scripts: lazy imports of the plotting libraries and a tables-only mode.
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+Importing seaborn, matplotlib, pingouin or psignifit takes longer than computing most of the tables.
+The figure scripts import these libraries with lazy_import: the name is bound at once, but the
+library is imported the first time one of its attributes is used, i.e. when a panel needs it. The
+time spent importing each library is kept in import_times.
+
+The mode is chosen with the environment variable FIGURE_MODE:
+- "plots" (default): the panels are drawn and saved as set by saveplot, and the tables are saved as
+  set by savetable. Saved plots are drawn with the non-interactive Agg backend (no window, no display).
+- "tables": only the tables are computed and saved; the panels are not drawn and the plotting
+  libraries are never imported.
+
+Running this file starts every figure script in both modes and reports the time spent in imports
+(python -X importtime) and the total run time.
+
+"""
+
+import importlib
+import os
+import sys
+import time
+import types
+
+MODES = ('plots', 'tables')
+
+# Seconds spent importing each lazily imported module
+import_times = {}
+
+
+def mode():
+    """Mode of this run, from the environment variable FIGURE_MODE."""
+    value = os.environ.get('FIGURE_MODE', 'plots').lower()
+    if value not in MODES:
+        raise ValueError("FIGURE_MODE must be one of {}, not {!r}".format(MODES, value))
+
+    return value
+
+
+class _LazyModule(types.ModuleType):
+
+    def __getattr__(self, attribute):
+        # Only called for attributes that are not set yet: the first use imports the module
+        start = time.perf_counter()
+        module = importlib.import_module(self.__name__)
+        import_times.setdefault(self.__name__, time.perf_counter() - start)
+        self.__dict__.update(module.__dict__)
+
+        return getattr(module, attribute)
+
+
+def lazy_import(name):
+    """Module that is imported the first time one of its attributes is used (at once if already imported)."""
+    if name in sys.modules:
+        return sys.modules[name]
+
+    return _LazyModule(name)
+
+
+def configure(saveplot):
+    """Whether the panels are drawn in this run; saved plots use the Agg backend."""
+    plotting = mode() == 'plots'
+    if plotting and saveplot:
+        if 'matplotlib' in sys.modules:
+            sys.modules['matplotlib'].use('Agg')
+        else:
+            # read by matplotlib when it is imported
+            os.environ['MPLBACKEND'] = 'Agg'
+
+    return plotting
+
+
+def parse_importtime(stderr):
+    """Seconds spent in imports, from the output of python -X importtime (sum of the top-level imports)."""
+    total = 0
+    for line in stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package", nested imports are indented
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, package = line.split('|')
+            if cumulative.strip().isdigit() and not package[1:].startswith(' '):
+                total += int(cumulative)
+
+    return total / 1e6
+
+
+if __name__ == '__main__':
+    import glob
+    import subprocess
+
+    print("{:<18}{:<8}{:>13}{:>10}".format('script', 'mode', 'imports [s]', 'run [s]'))
+    for script in sorted(glob.glob('Figure_*.py')):
+        for figure_mode in MODES:
+            start = time.perf_counter()
+            process = subprocess.run([sys.executable, '-X', 'importtime', script], capture_output=True, text=True,
+                                     env=dict(os.environ, FIGURE_MODE=figure_mode, OUTDATED_IGNORE='1'))
+            elapsed = time.perf_counter() - start
+            status = '' if process.returncode == 0 else '  failed'
+            print("{:<18}{:<8}{:>13.2f}{:>10.1f}{}".format(script, figure_mode, parse_importtime(process.stderr),
+                                                           elapsed, status))
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Figure writer of the figure scripts: the files are written as plt.savefig would, the png compressed in threads.
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+save_figure replaces one plt.savefig per format and plt.close. The formats are written in the order
+of the original scripts (pdf, then png), so the files are the same as those of plt.savefig, down to
+the pixels of the png:
+- the vector formats (pdf, svg) are written by savefig in the thread of the script: matplotlib is
+  not thread-safe, and savefig reads the rc settings (savefig.*, pdf.fonttype, fonts) of the moment;
+- the png is rendered on the Agg canvas in the thread of the script, and only the compression of
+  the rendered pixels is handed to a pool of threads, while the script goes on with the next panel.
+
+Each file is encoded in memory and written in one go when it is complete, so a failed or interrupted
+encoding leaves no partial file. finish_figures waits for all files and raises the error of a failed
+encoding. The draw and encode time, the size and the number of rasterized artists of every file are
+kept in records.
+
+Heavy artists are rasterized in the vector formats: when the lines or collections of one type in an
+axes (e.g. the points of a stripplot, the events of an eventplot with one collection per session, a
+waveform of raw samples) draw more than rasterize_above items (markers, events, polygons or mesh
+cells) or more than rasterize_vertices_above path vertices, they are embedded as an image of
+raster_dpi dots per inch. Every item is a drawing operation of its own in a pdf, while the vertices
+of a line are cheap, hence the two thresholds. The axes, ticks, labels and other text stay vectors.
+The png is not changed; rasterize_above=None keeps every artist as a vector.
+
+Running this file compares save_figure with two plt.savefig calls on synthetic multi-panel figures,
+and the pdf of a heavy scatter plot with and without rasterization.
+
+"""
+
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from figure_mode import lazy_import
+
+mpl = lazy_import('matplotlib')
+plt = lazy_import('matplotlib.pyplot')
+image = lazy_import('matplotlib.image')
+lines = lazy_import('matplotlib.lines')
+collections = lazy_import('matplotlib.collections')
+
+output_path = './analysis_output'
+
+# Rasterization of heavy artists in the vector formats: items and path vertices per axes and artist type,
+# and resolution of the images replacing them
+RASTERIZE_ABOVE = 5000
+RASTERIZE_VERTICES_ABOVE = 100000
+RASTER_DPI = 300
+
+# One row per file written: figure, format, draw and encode time (s), size (bytes), rasterized artists
+records = []
+_records_lock = threading.Lock()
+
+
+def element_count(artist):
+    """Items (markers, events, polygons or mesh cells) and path vertices drawn by a line or collection."""
+    if isinstance(artist, lines.Line2D):
+        vertices = len(artist.get_xydata())
+        # a line without markers is one path
+        return (vertices if artist.get_marker() not in ('None', None, '', ' ') else 1), vertices
+    if isinstance(artist, collections.QuadMesh):
+        # one cell per quadrilateral; its paths are only built when asked for
+        coordinates = artist.get_coordinates()
+        cells = (coordinates.shape[0] - 1) * (coordinates.shape[1] - 1)
+        return cells, 4 * cells
+
+    paths = artist.get_paths()
+    return max(len(artist.get_offsets()), len(paths)), sum(len(path.vertices) for path in paths)
+
+
+def rasterize_heavy(figure, items_above=RASTERIZE_ABOVE, vertices_above=RASTERIZE_VERTICES_ABOVE):
+    """Rasterize the lines and collections of every type in an axes that draw too many items or vertices.
+
+    Returns the number of artists rasterized; axes, ticks and text are left as vectors.
+    """
+    rasterized = 0
+    for ax in figure.axes:
+        groups = {}
+        for artist in ax.get_children():
+            # the ticks and grid lines belong to the axis, not to the children of the axes
+            if isinstance(artist, (lines.Line2D, collections.Collection)) and artist.get_visible():
+                groups.setdefault(type(artist), []).append(artist)
+        for artists in groups.values():
+            items, vertices = np.sum([element_count(artist) for artist in artists], axis=0)
+            if items > items_above or vertices > vertices_above:
+                for artist in artists:
+                    artist.set_rasterized(True)
+                rasterized += len(artists)
+
+    return rasterized
+
+
+def _write(name, file_format, path, data, start, draw_time=0.0, rasterized=0):
+    # The file is written in one go when it is complete
+    with open(os.path.join(path, '{}.{}'.format(name, file_format)), 'wb') as file_object:
+        file_object.write(data)
+
+    with _records_lock:
+        records.append({'figure': name, 'format': file_format, 'draw': draw_time,
+                        'encode': time.perf_counter() - start, 'size': len(data), 'rasterized': rasterized})
+
+
+def _encode_png(name, path, pixels, dpi, draw_time):
+    # Runs in a worker thread: compresses pixels that are already rendered, without touching the figure
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    image.imsave(buffer, pixels, format='png', dpi=dpi)
+    _write(name, 'png', path, buffer.getvalue(), start, draw_time)
+
+
+class FigureSink:
+
+    def __init__(self, path=output_path, formats=('pdf', 'png'), n_workers=2, rasterize_above=RASTERIZE_ABOVE,
+                 rasterize_vertices_above=RASTERIZE_VERTICES_ABOVE, raster_dpi=RASTER_DPI):
+        self.path = path
+        self.formats = formats
+        self.n_workers = n_workers
+        self.rasterize_above = rasterize_above
+        self.rasterize_vertices_above = rasterize_vertices_above
+        self.raster_dpi = raster_dpi
+        self._executor = None
+        self._pending = []
+
+    def save(self, name, figure=None, formats=None):
+        """Write a figure (default: the current pyplot figure) as path/name.<format> and close it."""
+        figure = plt.gcf() if figure is None else figure
+        formats = self.formats if formats is None else formats
+
+        # Heavy artists are images in the vector formats (the png is not changed by this)
+        rasterized = 0
+        if self.rasterize_above is not None and any(file_format != 'png' for file_format in formats):
+            rasterized = rasterize_heavy(figure, self.rasterize_above, self.rasterize_vertices_above)
+
+        # The vector formats are written in this thread, in the order of the formats, as plt.savefig does: matplotlib
+        # is not thread-safe and savefig reads the rc settings of the moment
+        for file_format in formats:
+            if file_format != 'png':
+                start = time.perf_counter()
+                buffer = io.BytesIO()
+                # resolution of the rasterized artists in the vector formats
+                figure.savefig(buffer, format=file_format, **({'dpi': self.raster_dpi} if rasterized else {}))
+                _write(name, file_format, self.path, buffer.getvalue(), start, rasterized=rasterized)
+
+        if 'png' in formats:
+            dpi = mpl.rcParams['savefig.dpi']
+            dpi = figure.dpi if dpi == 'figure' else dpi
+            if dpi == figure.dpi and type(figure.canvas).__name__ == 'FigureCanvasAgg':
+                # The pixels come from a draw on the Agg canvas, as savefig would render them; only their
+                # compression is left to a thread
+                start = time.perf_counter()
+                if figure.get_layout_engine() is not None and any(file_format != 'png' for file_format in formats):
+                    # plt.savefig draws the figure once more after saving, which runs the layout again
+                    figure.canvas.draw()
+                figure.canvas.draw()
+                pixels = np.array(figure.canvas.buffer_rgba())
+                draw_time = time.perf_counter() - start
+                if self.n_workers == 0:
+                    _encode_png(name, self.path, pixels, dpi, draw_time)
+                else:
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(max_workers=self.n_workers)
+                    self._pending.append(self._executor.submit(_encode_png, name, self.path, pixels, dpi,
+                                                               draw_time))
+            else:
+                start = time.perf_counter()
+                buffer = io.BytesIO()
+                figure.savefig(buffer, format='png')
+                _write(name, 'png', self.path, buffer.getvalue(), start)
+
+        plt.close(figure)
+
+    def wait(self):
+        """Wait until all figures are written; raises the error of a failed encoding."""
+        pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+
+_sink = None
+
+
+def current_sink():
+    """The figure writer of this interpreter, created when it is first needed."""
+    global _sink
+    if _sink is None:
+        _sink = FigureSink()
+
+    return _sink
+
+
+def save_figure(name, figure=None, formats=None):
+    """Write a figure (default: the current pyplot figure) as ./analysis_output/name.pdf and .png (or formats)."""
+    current_sink().save(name, figure, formats)
+
+
+def finish_figures():
+    """Wait until all figures of this interpreter are written."""
+    if _sink is not None:
+        _sink.wait()
+
+
+def report():
+    """Draw time, encode time, size and rasterized artists of every file written so far, one row per file."""
+    import pandas as pd
+
+    with _records_lock:
+        return pd.DataFrame(records, columns=['figure', 'format', 'draw', 'encode', 'size', 'rasterized'])
+
+
+if __name__ == '__main__':
+    import tempfile
+
+    mpl.use('Agg')
+
+    def panel(seed):
+        # A constrained-layout grid of scatter plots and histograms, like the per-animal figures
+        rng = np.random.default_rng(seed)
+        f, ax = plt.subplots(2, 8, constrained_layout=True, figsize=(7, 3))
+        for a in ax.ravel():
+            a.scatter(rng.normal(size=300), rng.normal(size=300), s=2)
+            a.set_title('animal {}'.format(rng.integers(100)), fontsize=6)
+        return f
+
+    directory = tempfile.mkdtemp()
+    sink = FigureSink(directory)
+    timings = {}
+    for method in ['savefig', 'sink']:
+        start = time.perf_counter()
+        for i in range(12):
+            f = panel(i)
+            if method == 'savefig':
+                plt.savefig(os.path.join(directory, 'savefig_{}.pdf'.format(i)), format='pdf')
+                plt.savefig(os.path.join(directory, 'savefig_{}.png'.format(i)), format='png')
+                plt.close()
+            else:
+                sink.save('sink_{}'.format(i))
+        sink.wait()
+        timings[method] = time.perf_counter() - start
+
+    # Same pixels as savefig, in the same order of the formats
+    same = all(np.array_equal(plt.imread(os.path.join(directory, 'savefig_{}.png'.format(i))),
+                              plt.imread(os.path.join(directory, 'sink_{}.png'.format(i)))) for i in range(12))
+    print("12 figures, pdf and png: two savefig {:.1f} s, figure sink {:.1f} s; identical png: {}".format(
+        timings['savefig'], timings['sink'], same))
+    print(report().groupby('format')[['draw', 'encode', 'size']].mean().round(3).to_string())
+
+    # A raster of 20000 events, one collection per session, as vectors and rasterized
+    rng = np.random.default_rng(0)
+    for name, rasterize_above in [('vector', None), ('rasterized', RASTERIZE_ABOVE)]:
+        f, a = plt.subplots(figsize=(4, 3))
+        a.eventplot([np.sort(rng.random(100)) for _ in range(200)], color='grey', linelengths=1)
+        a.set_title('200 sessions')
+        FigureSink(directory, formats=('pdf',), n_workers=0, rasterize_above=rasterize_above).save('raster_' + name)
+    rows = report().query("figure.str.startswith('raster_')", engine='python')
+    print(rows[['figure', 'encode', 'size', 'rasterized']].round(3).to_string(index=False))
+
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Sorted group index over the trial-level tables (e.g. Figure_3D_Responses.csv).
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+The table is sorted once by the key columns (by default monkey, task, outcome, stimulus), so that
+the rows of every combination of keys are stored next to each other. A selection then returns a
+slice of the sorted columns instead of building a boolean mask over the full table. Selections on
+leading keys (e.g. monkey and task) are contiguous as well; any other combination of keys is
+gathered from the contiguous blocks it covers.
+
+Running this file compares the index against boolean masks on a synthetic Responses table.
+
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+RESPONSE_KEYS = ('monkey', 'task', 'outcome', 'stimulus')
+
+
+class GroupIndex:
+
+    def __init__(self, df, keys=RESPONSE_KEYS):
+        self.keys = tuple(keys)
+
+        # Combine the integer codes of the keys into a single group code and sort by it; the sort is
+        # stable, so the original order of the trials within each group is kept
+        group_codes = np.zeros(len(df), dtype=np.int64)
+        for key in self.keys:
+            codes, uniques = pd.factorize(df[key], sort=True)
+            group_codes = group_codes * (len(uniques) + 1) + (codes + 1)
+
+        # Small codes use numpy's radix sort
+        if len(df) and group_codes.max() < 2 ** 16:
+            group_codes = group_codes.astype(np.uint16)
+        order = np.argsort(group_codes, kind='stable')
+        group_codes = group_codes[order]
+        self.data = df.take(order).reset_index(drop=True)
+        self._columns = {}
+
+        # Find the first row of each group from the points where the group code changes
+        n_rows = len(self.data)
+        starts = np.flatnonzero(np.r_[True, group_codes[1:] != group_codes[:-1]]) if n_rows else np.array([], int)
+        stops = np.append(starts[1:], n_rows)
+        labels = zip(*[self.data[key].to_numpy()[starts] for key in self.keys])
+
+        self.groups = {label: (start, stop) for label, start, stop in zip(labels, starts, stops)}
+
+    def _ranges(self, selection):
+        unknown = set(selection) - set(self.keys)
+        if unknown:
+            raise KeyError("Not a key of the index: {}".format(', '.join(sorted(unknown))))
+
+        positions = [(self.keys.index(key), value) for key, value in selection.items()]
+        ranges = sorted(bounds for label, bounds in self.groups.items()
+                        if all(label[i] == value for i, value in positions))
+
+        # Merge neighbouring groups into contiguous blocks
+        merged = []
+        for start, stop in ranges:
+            if merged and merged[-1][1] == start:
+                merged[-1] = (merged[-1][0], stop)
+            else:
+                merged.append((start, stop))
+
+        return merged
+
+    def column(self, name):
+        if name not in self._columns:
+            self._columns[name] = self.data[name].to_numpy()
+
+        return self._columns[name]
+
+    def values(self, name, **selection):
+        """Return the values of a column for the selected groups; a view when the rows are contiguous."""
+        values = self.column(name)
+        ranges = self._ranges(selection)
+
+        if len(ranges) == 0:
+            return values[:0]
+        if len(ranges) == 1:
+            return values[ranges[0][0]:ranges[0][1]]
+
+        return np.concatenate([values[start:stop] for start, stop in ranges])
+
+    def frame(self, **selection):
+        """Return the rows of the selected groups as a DataFrame."""
+        ranges = self._ranges(selection)
+
+        if len(ranges) == 0:
+            return self.data.iloc[:0]
+        if len(ranges) == 1:
+            return self.data.iloc[ranges[0][0]:ranges[0][1]]
+
+        return self.data.iloc[np.concatenate([np.arange(start, stop) for start, stop in ranges]).astype(int)]
+
+
+if __name__ == '__main__':
+    # Compare the index with boolean masks for the per-animal panels of Figure 3CD
+    rng = np.random.default_rng(0)
+    n_rows = 5000000
+    monkeys = list('abcdefghijklmn')
+    Responses = pd.DataFrame({'RT': rng.gamma(2, 1, n_rows).round(3),
+                              'monkey': pd.Categorical(rng.choice(monkeys, n_rows)),
+                              'outcome': pd.Categorical(rng.choice(['correct', 'wrong', 'ignored'], n_rows)),
+                              'stimulus': pd.Categorical(rng.choice(['str', 'voc'], n_rows)),
+                              'task': pd.Categorical(rng.choice(['2 Visual Stimuli', '3 Visual Stimuli'], n_rows))})
+
+    start = time.perf_counter()
+    for m in monkeys:
+        for t in ['2 Visual Stimuli', '3 Visual Stimuli']:
+            plot_df = Responses[(Responses['monkey'] == m) & (Responses['outcome'] == 'correct') &
+                                (Responses['task'] == t)]
+            for s in ['str', 'voc']:
+                a = Responses[(Responses['monkey'] == m) & (Responses['outcome'] == 'correct') &
+                              (Responses['stimulus'] == s) & (Responses['task'] == t)]['RT']
+    mask_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = GroupIndex(Responses)
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for m in monkeys:
+        for t in ['2 Visual Stimuli', '3 Visual Stimuli']:
+            plot_df = index.frame(monkey=m, outcome='correct', task=t)
+            for s in ['str', 'voc']:
+                b = index.values('RT', monkey=m, outcome='correct', stimulus=s, task=t)
+    index_time = time.perf_counter() - start
+
+    assert np.array_equal(a.to_numpy(), b)
+    print("{} rows, {} animals".format(n_rows, len(monkeys)))
+    print("boolean masks: {:.1f} ms, index: {:.1f} ms build + {:.2f} ms lookups".format(
+        mask_time * 1000, build_time * 1000, index_time * 1000))
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Hit rate tables with binomial tests (Figure_3C_HR.csv, Figure_4C_HR.csv) from trial-level responses.
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+For every animal x task x stimulus (or any other grouping, e.g. per session) the trials are counted
+per outcome in one grouped count. The binomial test asks whether the hits among the answered trials
+(bin_N = hits + wrong) are more than expected by chance; it is the survival function of the binomial
+distribution, evaluated for all rows at once. The p-values are then adjusted over all rows of the
+table (Bonferroni, as in the curated tables).
+
+Running this file regenerates the HR tables of Figure 3C and 4C from the Responses tables, compares
+them with the curated files and times a per-session table against one binomial test per group.
+
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.stats import binom
+from statsmodels.stats.multitest import multipletests
+
+# Outcome labels of the Responses tables for hits, wrong and ignored trials
+OUTCOME_LABELS = {'hits': 'correct', 'wrong': 'wrong', 'ignored': 'ignored'}
+
+
+def hr_table(responses, keys=('monkey', 'task', 'stimulus'), outcome='outcome', labels=None, chance=0.5,
+             method='bonferroni'):
+    """Count hits, wrong and ignored trials per group and test the hits against chance.
+
+    Returns the columns of the curated HR tables: N, the rate and number of trials of each outcome,
+    bin_N (answered trials), bin_DF, the one-sided binomial p-value and the adjusted p-value.
+    """
+    keys = list(keys)
+    labels = OUTCOME_LABELS if labels is None else labels
+
+    counts = responses.groupby(keys + [outcome], observed=True, sort=True).size().unstack(fill_value=0)
+    counts = counts.reindex(columns=list(labels.values()), fill_value=0)
+    counts.columns = list(labels)
+    counts.columns.name = None
+
+    table = counts.reset_index()
+    for key in keys:
+        table[key] = table[key].astype(object)
+
+    n = counts.to_numpy(dtype=float)
+    table['N'] = n.sum(axis=1)
+    for i, name in enumerate(labels):
+        table[name + '_n'] = n[:, i]
+        table[name] = n[:, i] / table['N']
+
+    # P(X >= hits) for X ~ Binomial(bin_N, chance)
+    table['bin_N'] = table['hits_n'] + table['wrong_n']
+    table['bin_DF'] = 1.0
+    table['binomial'] = binom.sf(table['hits_n'] - 1, table['bin_N'], chance)
+    table['adjusted_p'] = multipletests(pvals=table['binomial'], alpha=0.05, method=method)[1]
+
+    # Same column order as the curated tables
+    columns = sorted(c for c in table.columns if c != 'adjusted_p') + ['adjusted_p']
+
+    return table[columns]
+
+
+if __name__ == '__main__':
+    from scipy.stats import binomtest
+
+    from data_schema import load_table
+
+    # Regenerate the curated HR tables
+    for HR_name, Responses_name in [('Figure_3C_HR.csv', 'Figure_3D_Responses.csv'),
+                                    ('Figure_4C_HR.csv', 'Figure_4C_Responses.csv')]:
+        curated = load_table('./data/' + HR_name)
+        HR = hr_table(load_table('./data/' + Responses_name))
+
+        merged = curated.merge(HR, on=['monkey', 'task', 'stimulus'], suffixes=('', '_new'))
+        same = all(np.allclose(merged[c], merged[c + '_new'], rtol=1e-9)
+                   for c in ['N', 'hits_n', 'wrong_n', 'ignored_n', 'bin_N', 'binomial', 'adjusted_p'])
+        print("{}: {} of {} rows regenerated, identical: {}".format(HR_name, len(merged), len(curated), same))
+
+    # Per-session table of a large synthetic cohort against one binomial test per group
+    rng = np.random.default_rng(0)
+    n_rows = 2000000
+    Responses = pd.DataFrame({'monkey': pd.Categorical(rng.choice(['m{}'.format(i) for i in range(100)], n_rows)),
+                              'session': rng.integers(1, 100, n_rows).astype(np.int16),
+                              'stimulus': pd.Categorical(rng.choice(['str', 'voc'], n_rows)),
+                              'outcome': pd.Categorical(rng.choice(['correct', 'wrong', 'ignored'], n_rows,
+                                                                   p=[.6, .3, .1]))})
+
+    start = time.perf_counter()
+    HR = hr_table(Responses, keys=['monkey', 'session', 'stimulus'])
+    table_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    loop = [binomtest(int(k), int(n), 0.5, alternative='greater').pvalue for k, n in zip(HR['hits_n'], HR['bin_N'])]
+    loop_time = time.perf_counter() - start
+
+    assert np.allclose(loop, HR['binomial'], rtol=1e-9)
+    print("{} trials, {} rows: table {:.0f} ms, binomial tests alone in a loop {:.0f} ms".format(
+        n_rows, len(HR), table_time * 1000, loop_time * 1000))
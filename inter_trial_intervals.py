@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Inter-trial intervals and re-engagement likelihood (Supplementary Figure 3) from trial timestamps.
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+The input is a trial-level mXBI log, as Figure_2_correctedDF.csv: one row per trial with the
+time the trial started ("timestamp", ms) and its outcome ("reward": 'True', 'False', or empty for
+ignored trials). The trials of all animals and sessions are sorted once on a single integer key
+(session code x stride + time), so that:
+
+- the interval to the next trial is a difference of neighbouring timestamps, and the last trial of
+  a session has no interval (session boundaries are never crossed);
+- the time-out that follows a wrong trial (penalty_wrong) is subtracted from its interval;
+- the number of trials started within likelihood_window after a trial (after its time-out) is the
+  distance between the searchsorted positions of the end of its time-out and of the end of its
+  window; a trial is followed by re-engagement when that number is above zero.
+
+The summary gives, for every animal and outcome, the mean and standard deviation of the intervals
+between 0 and maximum_ITI and the likelihood of re-engagement, as in Figure_S3_ITI_summary.csv: the
+trials of that outcome followed by re-engagement, divided by all trials of the animal.
+
+Running this file computes the intervals of Figure_2_correctedDF.csv and times the engine on a
+synthetic log of several million trials against a loop over the sessions.
+
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+OUTCOMES = ('reward', 'wrong', 'ignored')
+
+
+def trial_outcomes(reward):
+    """'reward', 'wrong' or 'ignored' for the reward column of the mXBI log ('True', 'False' or empty)."""
+    # Only the few distinct values are compared as text
+    values, uniques = pd.factorize(pd.Series(reward, dtype=object))
+    unique_codes = np.array([{'true': 0, 'false': 1}.get(str(u).lower(), 2) for u in uniques] + [2])
+    codes = unique_codes[values]
+
+    return pd.Categorical.from_codes(codes, categories=OUTCOMES)
+
+
+def inter_trial_intervals(trials, keys=('monkey', 'sessionNumber'), time='timestamp', reward='reward',
+                          penalty_wrong=5000, likelihood_window=30000):
+    """Interval to the next trial of the same session and re-engagement within the window, for every trial.
+
+    Returns one row per trial, sorted by keys and time, with the keys, the time, the outcome, the
+    interval (ms, NaN for the last trial of a session; the time-out is subtracted after wrong trials),
+    the number of trials started within the window and whether there was at least one.
+    """
+    keys = list(keys)
+    session = trials.groupby(keys, observed=True, sort=True).ngroup().to_numpy(dtype=np.int64)
+    times = trials[time].to_numpy(dtype=np.int64)
+    outcome = trial_outcomes(trials[reward].to_numpy())
+    penalty = np.where(outcome.codes == 1, penalty_wrong, 0).astype(np.int64)
+
+    # One integer key orders the trials by session and time; the stride leaves more than a window of
+    # empty time between sessions, so a window never reaches into the next session
+    start = times - times.min() if len(times) else times
+    stride = (start.max() if len(times) else 0) + int(penalty_wrong) + int(likelihood_window) + 1
+    key = session * stride + start
+    order = np.argsort(key, kind='stable')
+    key, session, times, penalty = key[order], session[order], times[order], penalty[order]
+
+    # Interval to the next trial of the same session
+    same_session = np.r_[session[1:] == session[:-1], False]
+    iti = np.full(len(key), np.nan)
+    iti[:-1] = np.diff(times)
+    iti = np.where(same_session, iti - penalty, np.nan)
+
+    # Trials started between the end of the time-out and the end of the window; the trials started during the
+    # time-out are not counted (and a trial never counts itself)
+    window_start = np.maximum(np.searchsorted(key, key + penalty, side='left'), np.arange(1, len(key) + 1))
+    window_end = np.searchsorted(key, key + penalty + likelihood_window, side='right')
+    in_window = np.maximum(window_end - window_start, 0)
+
+    result = trials.iloc[order][keys + [time]].reset_index(drop=True)
+    result['outcome'] = outcome[order]
+    result['ITI'] = iti
+    result['trials in window'] = in_window
+    result['re-engaged'] = in_window > 0
+
+    return result
+
+
+def iti_summary(itis, animal='monkey', outcomes=('reward', 'wrong'), maximum_ITI=60000):
+    """Mean and std of the intervals (0 < ITI < maximum_ITI) and re-engagement likelihood per animal and outcome."""
+    animal_codes, animals = pd.factorize(itis[animal], sort=True)
+    outcome_codes = pd.Categorical(itis['outcome'].astype(object), categories=list(outcomes)).codes
+    cell = animal_codes * len(outcomes) + outcome_codes
+    size = len(animals) * len(outcomes)
+
+    iti = itis['ITI'].to_numpy(dtype=float)
+    valid = (outcome_codes >= 0) & (iti > 0) & (iti < maximum_ITI)
+    n = np.bincount(cell[valid], minlength=size).astype(float)
+    total = np.bincount(cell[valid], weights=iti[valid], minlength=size)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = total / n
+        # Sample standard deviation (ddof=1, as pandas), from the deviations of the cell means
+        deviation = iti[valid] - mean[cell[valid]]
+        std = np.sqrt(np.bincount(cell[valid], weights=deviation ** 2, minlength=size) / (n - 1))
+
+    # Re-engaged trials of each outcome over all trials of the animal
+    engaged = (outcome_codes >= 0) & itis['re-engaged'].to_numpy()
+    likelihood = (np.bincount(cell[engaged], minlength=size) /
+                  np.repeat(np.bincount(animal_codes, minlength=len(animals)), len(outcomes)))
+
+    return pd.DataFrame({'animal': np.repeat(np.asarray(animals, dtype=object), len(outcomes)),
+                         'outcome': np.tile(np.array(outcomes, dtype=object), len(animals)),
+                         'ITI mean': mean, 'ITI std': std, 'likelihood': likelihood})
+
+
+if __name__ == '__main__':
+    from data_schema import load_table
+
+    likelihood_window = 30000  # in milliseconds
+    maximum_ITI = 60000  # in milliseconds
+    penalty_wrong = 5000  # in milliseconds
+
+    trials = load_table('./data/Figure_2_correctedDF.csv')
+    itis = inter_trial_intervals(trials, penalty_wrong=penalty_wrong, likelihood_window=likelihood_window)
+    print(iti_summary(itis, maximum_ITI=maximum_ITI).round(3).to_string(index=False))
+
+    # Synthetic log: many animals, sessions of a few hundred trials, intervals of seconds to minutes
+    rng = np.random.default_rng(0)
+    n_sessions = 20000
+    n_trials = rng.integers(100, 400, n_sessions)
+    session = np.repeat(np.arange(n_sessions), n_trials)
+    reward = rng.choice(np.array(['True', 'False', None], dtype=object), len(session), p=[.6, .3, .1])
+    gaps = rng.exponential(8000, len(session)).astype(np.int64) + np.where(reward == 'False', penalty_wrong, 0)
+    Trials = pd.DataFrame({'monkey': pd.Categorical(np.array(['m{}'.format(i) for i in range(200)])[session % 200]),
+                           'sessionNumber': (session // 200).astype(np.int16),
+                           'timestamp': np.cumsum(gaps) - np.repeat(np.cumsum(gaps)[np.cumsum(n_trials) - n_trials],
+                                                                     n_trials),
+                           'reward': reward})
+    # Logs are not always written in order
+    Trials = Trials.sample(frac=1, random_state=0).reset_index(drop=True)
+
+    start = time.perf_counter()
+    itis = inter_trial_intervals(Trials, penalty_wrong=penalty_wrong, likelihood_window=likelihood_window)
+    summary = iti_summary(itis, maximum_ITI=maximum_ITI)
+    engine_time = time.perf_counter() - start
+
+    # The same with a loop over the sessions (the window counted for every 50th trial)
+    start = time.perf_counter()
+    loop_iti, loop_counts, positions = [], [], []
+    offset = 0
+    for _, df in Trials.groupby(['monkey', 'sessionNumber'], observed=True, sort=True):
+        df = df.sort_values('timestamp', kind='stable')
+        t = df['timestamp'].to_numpy()
+        penalty = np.where(df['reward'].to_numpy() == 'False', penalty_wrong, 0)
+        loop_iti.append(np.append(np.diff(t) - penalty[:-1], np.nan))
+        for i in range(0, len(t), 50):
+            later = t[i + 1:]
+            loop_counts.append(((later >= t[i] + penalty[i]) & (later <= t[i] + penalty[i] + likelihood_window)).sum())
+            positions.append(offset + i)
+        offset += len(t)
+    loop_time = time.perf_counter() - start
+
+    assert np.allclose(np.concatenate(loop_iti), itis['ITI'], equal_nan=True)
+    assert np.array_equal(loop_counts, itis['trials in window'].to_numpy()[positions])
+    print("{} trials in {} sessions: engine {:.0f} ms, loop over sessions {:.0f} ms".format(
+        len(Trials), n_sessions, engine_time * 1000, loop_time * 1000))
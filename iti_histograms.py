@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Mergeable histograms of the inter-trial intervals of Supplementary Figure 3.
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+The histogram keeps, for every animal x outcome, the number of intervals in fixed-width bins
+between 0 and maximum_ITI, plus the intervals below 0 (underflow, e.g. across session boundaries)
+and from maximum_ITI on (overflow). A chunk of intervals is added with a single np.bincount over
+(label, bin), so a file can be read in chunks and never has to be held in memory. Histograms with
+the same bins add up, which merges the counts of different devices or days without reading the
+intervals again.
+
+The counts of a data file are saved next to its columnar cache and rebuilt when the file changes.
+
+Running this file compares the accumulated counts with np.histogram and times a streamed file.
+
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+from data_schema import SCHEMAS
+
+
+class ITIHistogram:
+
+    def __init__(self, bin_width=200, maximum=60000, labels=(), counts=None, underflow=None, overflow=None):
+        self.bin_width = int(bin_width)
+        self.maximum = int(maximum)
+        self.n_bins = -(-self.maximum // self.bin_width)
+        self.labels = [tuple(label) for label in labels]
+        self._rows = {label: i for i, label in enumerate(self.labels)}
+        # Columns: underflow, the bins, overflow
+        self._counts = np.zeros((len(self.labels), self.n_bins + 2), dtype=np.int64)
+        if counts is not None:
+            self._counts[:, 0] = underflow
+            self._counts[:, 1:-1] = counts
+            self._counts[:, -1] = overflow
+
+    @property
+    def edges(self):
+        return np.arange(self.n_bins + 1) * self.bin_width
+
+    @property
+    def counts(self):
+        return self._counts[:, 1:-1]
+
+    @property
+    def underflow(self):
+        return self._counts[:, 0]
+
+    @property
+    def overflow(self):
+        return self._counts[:, -1]
+
+    def _add_labels(self, labels):
+        new = [label for label in labels if label not in self._rows]
+        for label in new:
+            self._rows[label] = len(self.labels)
+            self.labels.append(label)
+        if new:
+            self._counts = np.vstack([self._counts, np.zeros((len(new), self.n_bins + 2), dtype=np.int64)])
+
+        return np.array([self._rows[label] for label in labels], dtype=np.int64)
+
+    def update(self, animal, outcome, iti):
+        """Add a chunk of intervals (ms) with their animal and outcome; missing intervals are skipped."""
+        iti = np.asarray(iti, dtype=float)
+        kept = ~np.isnan(iti)
+        label_codes, uniques = pd.MultiIndex.from_arrays(
+            [np.asarray(animal, dtype=object)[kept], np.asarray(outcome, dtype=object)[kept]]).factorize()
+        rows = self._add_labels(list(uniques))[label_codes]
+
+        # Column 0 holds the underflow, the last column the overflow
+        column = np.clip(np.floor(iti[kept] / self.bin_width).astype(np.int64) + 1, 0, self.n_bins + 1)
+        column[iti[kept] >= self.maximum] = self.n_bins + 1
+        width = self.n_bins + 2
+        self._counts += np.bincount(rows * width + column, minlength=len(self.labels) * width).reshape(-1, width)
+
+        return self
+
+    def __add__(self, other):
+        if (self.bin_width, self.maximum) != (other.bin_width, other.maximum):
+            raise ValueError("Histograms with different bins cannot be merged")
+        merged = ITIHistogram(self.bin_width, self.maximum, self.labels, self.counts, self.underflow, self.overflow)
+        rows = merged._add_labels(other.labels)
+        merged._counts[rows] += other._counts
+
+        return merged
+
+    def total(self, label):
+        """Number of intervals of a label, including those outside the bins."""
+        return int(self._counts[self._rows[tuple(label)]].sum()) if tuple(label) in self._rows else 0
+
+    def window(self, label, low, high):
+        """Counts and edges of the bins of a label between low and high (ms)."""
+        first, last = int(low // self.bin_width), int(-(-high // self.bin_width))
+        if tuple(label) in self._rows:
+            counts = self.counts[self._rows[tuple(label)], first:last]
+        else:
+            counts = np.zeros(last - first, dtype=np.int64)
+
+        return counts, self.edges[first:last + 1]
+
+    def save(self, filename, source):
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(filename), suffix='.npz')
+        with os.fdopen(handle, 'wb') as file_object:
+            np.savez(file_object, bin_width=self.bin_width, maximum=self.maximum,
+                     animals=np.array([str(label[0]) for label in self.labels], dtype=str),
+                     outcomes=np.array([str(label[1]) for label in self.labels], dtype=str),
+                     counts=self._counts, mtime=source['mtime'], size=source['size'], hash=source['hash'])
+        os.replace(temporary, filename)
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as stored:
+            histogram = cls(int(stored['bin_width']), int(stored['maximum']),
+                            zip(stored['animals'].tolist(), stored['outcomes'].tolist()))
+            histogram._counts = stored['counts']
+            source = {'mtime': int(stored['mtime']), 'size': int(stored['size']), 'hash': str(stored['hash'])}
+
+            return histogram, source
+
+
+def load_iti_histograms(filename, bin_width=200, maximum=60000, chunksize=100000, use_cache=True):
+    """Histograms per animal and outcome of an ITI times file, reading the file in chunks only when it changed."""
+    target = os.path.join(data_cache.cache_path, "{}.hist_{}_{}.npz".format(
+        os.path.splitext(os.path.basename(filename))[0], bin_width, maximum))
+
+    if use_cache and os.path.exists(target):
+        histogram, source = ITIHistogram.load(target)
+        recorded_mtime = source['mtime']
+        if data_cache.source_unchanged(filename, source):
+            if source['mtime'] != recorded_mtime:
+                histogram.save(target, source)
+            return histogram
+
+    histogram = ITIHistogram(bin_width, maximum)
+    for chunk in pd.read_csv(filename, chunksize=chunksize, **SCHEMAS[os.path.basename(filename)]):
+        histogram.update(chunk['animal'], chunk['Outcome'], chunk['ITI'])
+
+    if use_cache:
+        os.makedirs(data_cache.cache_path, exist_ok=True)
+        histogram.save(target, data_cache.source_info(filename, with_hash=True))
+
+    return histogram
+
+
+if __name__ == '__main__':
+    from data_schema import load_table
+
+    filename = './data/Figure_S3_ITI_times.csv'
+    ITI_times = load_table(filename)
+
+    start = time.perf_counter()
+    histogram = load_iti_histograms(filename, use_cache=False)
+    stream_time = time.perf_counter() - start
+
+    load_iti_histograms(filename)
+    start = time.perf_counter()
+    load_iti_histograms(filename)
+    cached_time = time.perf_counter() - start
+
+    # Same counts as np.histogram of every animal and outcome
+    for (animal, outcome), df in ITI_times.groupby(['animal', 'Outcome'], observed=True):
+        reference = np.histogram(df['ITI'], bins=histogram.edges)[0]
+        reference[-1] -= (df['ITI'] == histogram.maximum).sum()
+        counts, _ = histogram.window((animal, outcome), 0, histogram.maximum)
+        assert np.array_equal(counts, reference) and histogram.total((animal, outcome)) == len(df)
+
+    # Two halves of the file (e.g. two devices) merge into the histogram of the whole file
+    half = len(ITI_times) // 2
+    parts = [ITIHistogram().update(df['animal'], df['Outcome'], df['ITI'])
+             for df in [ITI_times.iloc[:half], ITI_times.iloc[half:]]]
+    merged = parts[0] + parts[1]
+    assert all(np.array_equal(merged.window(label, 0, 60000)[0], histogram.window(label, 0, 60000)[0])
+               for label in histogram.labels)
+
+    print("{} intervals, {} histograms: streamed {:.1f} ms, from the cache {:.1f} ms".format(
+        len(ITI_times), len(histogram.labels), stream_time * 1000, cached_time * 1000))
+    print("outside 0 - {} ms: {} below, {} above".format(histogram.maximum, histogram.underflow.sum(),
+                                                           histogram.overflow.sum()))
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Learning curves (hit rate over the course of training) from trial-level data.
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+The curated tables of Figure 3AB, 4B and S1 contain the hit rate per percentage of trials of every
+animal, computed beforehand from the device logs. This module computes the same curves directly
+from a table with one row per trial (e.g. Figure_2_correctedDF.csv), for any number of animals:
+
+- binned: hit rate in consecutive bins of bin_size percent of the trials of each group (the
+  "p_trials" column of the curated tables);
+- sliding: hit rate over the last sliding_window_size trials, at every trial of each group.
+
+The rows are grouped once with the sorted group index; hits are then counted with one cumulative
+sum over the whole table, so no python loop runs over the windows or the bins.
+
+Running this file builds the curves of the animals in Figure_2_correctedDF.csv and benchmarks the
+engine against a grouped pandas rolling mean on a synthetic cohort.
+
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from group_index import GroupIndex
+
+
+def _grouped_hits(trials, keys, hit):
+    # Sort the trials by group (keeping their order within each group) and find the group of each row
+    trials = trials[trials[hit].notna()]
+    index = GroupIndex(trials, keys=keys)
+    hits = index.column(hit).astype(bool)
+
+    labels = list(index.groups)
+    starts = np.array([index.groups[label][0] for label in labels], dtype=np.int64)
+    stops = np.array([index.groups[label][1] for label in labels], dtype=np.int64)
+    group = np.repeat(np.arange(len(labels)), stops - starts)
+
+    return index, starts, stops, group, hits
+
+
+def _keys_frame(index, rows):
+    # Key columns of the given rows of the sorted table
+    return index.data.loc[:, list(index.keys)].take(rows).reset_index(drop=True)
+
+
+def binned_hit_rate(trials, keys, hit='hit', bin_size=5):
+    """Hit rate in bins of bin_size percent of the trials of each group.
+
+    Returns the keys, the upper edge of each bin (p_trials), the hit rate and the number of trials of
+    the group, as in the curated tables of Figure 3AB. Rows without outcome are not counted.
+    """
+    index, starts, stops, group, hits = _grouped_hits(trials, keys, hit)
+    n_bins = int(np.ceil(100 / bin_size))
+    n_trials = stops - starts
+
+    # Percentage of trials reached by each trial of its group, and the bin it falls in
+    position = np.arange(len(group)) - starts[group]
+    bins = np.minimum(position * 100 // (n_trials[group] * bin_size), n_bins - 1)
+
+    cells = group * n_bins + bins
+    hit_counts = np.bincount(cells, weights=hits, minlength=len(starts) * n_bins)
+    trial_counts = np.bincount(cells, minlength=len(starts) * n_bins)
+
+    # Groups with fewer trials than bins leave some bins empty
+    filled = np.flatnonzero(trial_counts)
+    result = _keys_frame(index, starts[filled // n_bins])
+    result['p_trials'] = (filled % n_bins + 1) * bin_size
+    result['HitRate'] = hit_counts[filled] / trial_counts[filled]
+    result['Trials'] = n_trials[filled // n_bins]
+
+    return result
+
+
+def sliding_hit_rate(trials, keys, hit='hit', sliding_window_size=100):
+    """Hit rate over the last sliding_window_size trials at every trial of each group.
+
+    The first trials of a group use the trials available so far. Returns the keys, the trial number
+    within the group, the percentage of trials reached (p_trials), the hit rate and the number of
+    trials of the group.
+    """
+    index, starts, stops, group, hits = _grouped_hits(trials, keys, hit)
+    n_trials = stops - starts
+
+    # Hits in a window are the difference of two entries of the cumulative sum over the whole table
+    cumulative = np.zeros(len(hits) + 1, dtype=np.int64)
+    np.cumsum(hits, out=cumulative[1:])
+
+    stop = np.arange(1, len(hits) + 1)
+    start = np.maximum(stop - sliding_window_size, starts[group])
+
+    result = index.data.loc[:, list(index.keys)]
+    result['trial'] = stop - starts[group]
+    result['p_trials'] = 100 * result['trial'].to_numpy() / n_trials[group]
+    result['HitRate'] = (cumulative[stop] - cumulative[start]) / (stop - start)
+    result['Trials'] = n_trials[group]
+
+    return result
+
+
+if __name__ == '__main__':
+    from data_schema import load_table
+
+    # Learning curves of the animals in the automated training data (a trial is a hit when rewarded)
+    corrected_df = load_table('./data/Figure_2_correctedDF.csv')
+    corrected_df['hit'] = corrected_df['reward'].map({'True': True, 'False': False, True: True, False: False})
+
+    binned = binned_hit_rate(corrected_df, ['monkey'], bin_size=5)
+    sliding = sliding_hit_rate(corrected_df, ['monkey'], sliding_window_size=100)
+    print(binned.pivot(index='p_trials', columns='monkey', values='HitRate').round(2))
+
+    # A synthetic cohort of hundreds of animals
+    rng = np.random.default_rng(0)
+    n_animals = 300
+    trials_per_animal = rng.integers(2000, 30000, n_animals)
+    animal = np.repeat(np.arange(n_animals), trials_per_animal)
+    learning = np.concatenate([np.linspace(0.5, 0.9, n) for n in trials_per_animal])
+    cohort = pd.DataFrame({'monkey': pd.Categorical(animal.astype(str)),
+                           'task': pd.Categorical(rng.choice(['2AC', '3AC'], len(animal))),
+                           'hit': rng.random(len(animal)) < learning})
+
+    start = time.perf_counter()
+    sliding = sliding_hit_rate(cohort, ['monkey', 'task'], sliding_window_size=100)
+    binned = binned_hit_rate(cohort, ['monkey', 'task'], bin_size=5)
+    engine_time = time.perf_counter() - start
+
+    # pandas rolling on categorical group keys mixes up the group labels, so compare on the integer codes
+    coded = cohort.assign(monkey=cohort['monkey'].cat.codes, task=cohort['task'].cat.codes)
+    start = time.perf_counter()
+    rolling = coded.groupby(['monkey', 'task'], sort=True)['hit'].rolling(100, min_periods=1).mean().to_numpy()
+    rolling_time = time.perf_counter() - start
+
+    assert np.allclose(rolling, sliding['HitRate'].to_numpy())
+    print("{} animals, {} trials".format(n_animals, len(cohort)))
+    print("sliding + binned: {:.0f} ms, pandas rolling (sliding only): {:.0f} ms".format(
+        engine_time * 1000, rolling_time * 1000))
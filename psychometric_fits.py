@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Psychometric fits of Figure 5B, run in parallel and cached on disk.
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+Every data set (the level, hits and total matrix of an animal, or of an animal in one session) is
+fitted with psignifit in its own process. The result of a fit is stored in "./data/.cache/psignifit"
+under the hash of its data matrix and fitting options, so a fit runs only once for the same input:
+running Figure_5B.py again loads the three fits from disk, and adding an animal costs a single fit.
+
+psignifit keeps function handles (sigmoid, priors) in the options of its result. Functions cannot be
+sent between processes or saved, so they are removed from the stored result; the sigmoid handle,
+which is needed for plotting, is rebuilt when a result is loaded.
+
+Running this file fits the animals of Figure 5B twice (cold and cached) and the single sessions.
+
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import data_cache
+
+FIT_CACHE_VERSION = 1
+
+
+def _fit_cache_path():
+    return os.path.join(data_cache.cache_path, 'psignifit')
+
+
+def fit_key(data, options):
+    """Hash of a (level, hits, total) matrix and the fitting options."""
+    data = np.ascontiguousarray(data, dtype=np.int64)
+    digest = hashlib.sha1()
+    digest.update(json.dumps({'version': FIT_CACHE_VERSION, 'shape': data.shape, 'options': options},
+                             sort_keys=True, default=str).encode())
+    digest.update(data.tobytes())
+
+    return digest.hexdigest()
+
+
+def group_data(df, keys=('animal',), columns=('level', 'hits', 'total')):
+    """Split a table like Figure_5.csv into one (level, hits, total) matrix per group of keys."""
+    keys = list(keys)
+    datasets = {}
+    for label, group in df.groupby(keys if len(keys) > 1 else keys[0], sort=True):
+        datasets[label] = group[list(columns)].to_numpy().astype(int)
+
+    return datasets
+
+
+def _strip_callables(value):
+    # Remove the function handles psignifit keeps in its results
+    if isinstance(value, dict):
+        return {k: _strip_callables(v) for k, v in value.items() if not callable(v)}
+    if isinstance(value, list):
+        return [_strip_callables(v) for v in value if not callable(v)]
+
+    return value
+
+
+def _restore_handles(res):
+    # Rebuild the sigmoid handle used by psignifit's plotting functions
+    from psignifit.getSigmoidHandle import getSigmoidHandle
+
+    res['options']['sigmoidHandle'] = getSigmoidHandle(res['options'])
+
+    return res
+
+
+def _fit(data, options):
+    import psignifit as ps
+
+    # psignifit completes the options dict it receives
+    return _strip_callables(ps.psignifit(data, dict(options)))
+
+
+def _load(filename):
+    try:
+        with open(filename, 'rb') as file_object:
+            return pickle.load(file_object)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+
+def _save(filename, res):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=os.path.dirname(filename))
+    with os.fdopen(handle, 'wb') as file_object:
+        pickle.dump(res, file_object, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, filename)
+
+
+def fit_all(datasets, options, n_workers=None, use_cache=True):
+    """Fit every data set of a dict {label: (level, hits, total) matrix}, reusing cached fits.
+
+    The missing fits run in a pool of processes, so a script calling it needs a main guard.
+    Returns a dict {label: psignifit result}.
+    """
+    results = {}
+    missing = {}
+    for label, data in datasets.items():
+        filename = os.path.join(_fit_cache_path(), fit_key(data, options) + '.pkl')
+        res = _load(filename) if use_cache else None
+        if res is None:
+            missing[label] = filename
+        else:
+            results[label] = res
+
+    parallel = n_workers != 1 and len(missing) > 1
+    if not parallel:
+        fitted = [_fit(datasets[label], options) for label in missing]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            fitted = list(executor.map(_fit, [datasets[label] for label in missing], [options] * len(missing)))
+
+    for (label, filename), res in zip(missing.items(), fitted):
+        if use_cache:
+            _save(filename, res)
+        results[label] = res
+
+    return {label: _restore_handles(results[label]) for label in datasets}
+
+
+if __name__ == '__main__':
+    from data_schema import load_table
+
+    options = {'sigmoidName': 'norm', 'expType': 'YesNo', 'confP': [.95, .95, .95, .95]}
+    AMP_df = load_table('./data/Figure_5.csv')
+    AMP_df = AMP_df[AMP_df['animal'].isin(['a', 'b', 'd'])]
+
+    datasets = group_data(AMP_df, ['animal'])
+    for label in datasets:
+        filename = os.path.join(_fit_cache_path(), fit_key(datasets[label], options) + '.pkl')
+        if os.path.exists(filename):
+            os.remove(filename)
+
+    start = time.perf_counter()
+    fits = fit_all(datasets, options)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fit_all(datasets, options)
+    warm = time.perf_counter() - start
+
+    for label, res in fits.items():
+        print("animal {}: threshold {:.1f} dB, CI [{:.1f}, {:.1f}]".format(
+            label, res['Fit'][0], res['conf_Intervals'][0][0, 0], res['conf_Intervals'][0][1, 1]))
+    print("{} fits: {:.1f} s in parallel, {:.1f} ms from the cache".format(len(fits), cold, warm * 1000))
+
+    start = time.perf_counter()
+    sessions = fit_all(group_data(AMP_df, ['animal', 'session']), options)
+    print("{} session fits in {:.1f} s".format(len(sessions), time.perf_counter() - start))
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Fast grid fit of the psychometric functions of Figure 5B, for previews of new sessions.
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+The model is the one fitted with psignifit in Figure 5B (sigmoid 'norm', experiment type 'YesNo'):
+
+    psi(x) = guess + (1 - lapse - guess) * Phi(C * (x - threshold) / width),   C = 2 * Phi^-1(1 - alpha)
+
+where width is the distance between the points at which the sigmoid reaches alpha and 1 - alpha.
+The binomial log-likelihood of the data is evaluated for a whole threshold x width x lapse x guess
+grid in one broadcasted array, with flat priors on threshold and width and the beta(1, 10) prior of
+psignifit on lapse and guess rate. A second, finer grid is then laid over the region that holds the
+posterior mass of the first. The threshold is the maximum of the posterior (as psignifit's MAP
+estimate), the confidence interval comes from the marginal posterior of the threshold. The
+overdispersion of psignifit's beta-binomial model is not included, so the intervals are narrower.
+This does not replace psignifit for the figures; it is meant for quick checks of new sessions.
+
+Running this file compares the preview thresholds with the psignifit thresholds in
+"./analysis_output/Figure_5B.txt".
+
+"""
+
+import re
+import time
+
+import numpy as np
+from scipy.special import ndtr, ndtri
+from scipy.stats import beta
+
+
+def default_axes(levels, grid_size=(40, 30, 12, 12)):
+    """Threshold, width, lapse and guess grids covering the plausible range (as psignifit's default priors)."""
+    levels = np.unique(levels)
+    if len(levels) > 1:
+        spread = levels.max() - levels.min()
+        spacing = np.diff(levels).min()
+    else:
+        # A single level sets neither: the grid then assumes levels 1 dB apart spread over 10 dB around it
+        spacing = 1.
+        spread = 10 * spacing
+
+    return [np.linspace(levels.min() - spread / 2, levels.max() + spread / 2, grid_size[0]),
+            np.geomspace(spacing, 3 * spread, grid_size[1]),
+            np.linspace(0, .5, grid_size[2], endpoint=False),
+            np.linspace(0, .5, grid_size[3], endpoint=False)]
+
+
+def pool_levels(data):
+    """Hits and totals per level of a (level, hits, total) matrix: the sufficient statistics of the fit."""
+    data = np.asarray(data, dtype=float)
+    levels, position = np.unique(data[:, 0], return_inverse=True)
+
+    return levels, np.bincount(position, weights=data[:, 1]), np.bincount(position, weights=data[:, 2])
+
+
+def log_likelihood(levels, hits, total, axes, alpha=0.05):
+    """Binomial log-likelihood (up to a constant) on the grid, axes (threshold, width, lapse, guess)."""
+    thresholds, widths, lapses, guesses = axes
+    C = 2 * ndtri(1 - alpha)
+    sigmoid = ndtr(C * (levels - thresholds[:, None, None]) / widths[None, :, None])  # threshold x width x level
+    scale = 1 - lapses[:, None] - guesses[None, :]  # lapse x guess
+
+    psi = guesses[None, None, None, :, None] + scale[None, None, :, :, None] * sigmoid[:, :, None, None, :]
+    np.clip(psi, 1e-12, 1 - 1e-12, out=psi)
+
+    return np.log(psi) @ hits + np.log1p(-psi) @ (total - hits)
+
+
+def log_prior(axes):
+    # Flat on threshold and width, beta(1, 10) on lapse and guess; lapse and guess together must leave room
+    # for the sigmoid
+    thresholds, widths, lapses, guesses = axes
+    prior = beta.logpdf(lapses, 1, 10)[:, None] + beta.logpdf(guesses, 1, 10)[None, :]
+    prior = np.where(lapses[:, None] + guesses[None, :] < 1, prior, -np.inf)
+
+    return np.broadcast_to(prior, (len(thresholds), len(widths)) + prior.shape)
+
+
+def _span(axis, marginal, floor=1e-6):
+    # Range of grid values holding the posterior mass, extended by one grid step on both sides
+    kept = np.flatnonzero(marginal > floor * marginal.max())
+    low, high = max(kept[0] - 1, 0), min(kept[-1] + 1, len(axis) - 1)
+
+    return axis[low], axis[high]
+
+
+def _marginals(posterior):
+    return [posterior.sum(axis=tuple(j for j in range(posterior.ndim) if j != i)) for i in range(posterior.ndim)]
+
+
+def estimate(log_posterior, axes, confP=.95):
+    """Posterior maximum and central confidence intervals of the parameters of a grid posterior."""
+    posterior = np.exp(log_posterior - log_posterior.max())
+
+    best = np.unravel_index(np.argmax(log_posterior), log_posterior.shape)
+    fit = np.array([axis[i] for axis, i in zip(axes, best)])
+
+    # Central interval of each marginal posterior, interpolated on the cumulative mass
+    conf_Intervals = np.empty((len(axes), 2))
+    bounds = [(1 - confP) / 2, (1 + confP) / 2]
+    for i, (axis, marginal) in enumerate(zip(axes, _marginals(posterior))):
+        cumulative = np.cumsum(marginal) / marginal.sum()
+        conf_Intervals[i] = np.interp(bounds, cumulative, axis)
+
+    return {'Fit': fit, 'conf_Intervals': conf_Intervals}
+
+
+def preview_fit(data, alpha=0.05, confP=.95, grid_size=(40, 30, 12, 12)):
+    """Fit a psychometric function to a (level, hits, total) matrix on a parameter grid.
+
+    Returns a dict with 'Fit' (threshold, width, lapse, guess at the posterior maximum) and
+    'conf_Intervals' (lower and upper bound of each parameter for the confidence level confP).
+    """
+    # Rows of the same level (e.g. from different sessions) are pooled, the likelihood does not change
+    levels, hits, total = pool_levels(data)
+
+    # First grid over the whole plausible range, then a finer grid over the region holding the posterior mass
+    axes = default_axes(levels, grid_size)
+    log_posterior = log_likelihood(levels, hits, total, axes, alpha) + log_prior(axes)
+
+    posterior = np.exp(log_posterior - log_posterior.max())
+    axes = [np.linspace(*_span(axis, marginal), size)
+            for axis, marginal, size in zip(axes, _marginals(posterior), grid_size)]
+    log_posterior = log_likelihood(levels, hits, total, axes, alpha) + log_prior(axes)
+
+    return estimate(log_posterior, axes, confP)
+
+
+if __name__ == '__main__':
+    from data_schema import load_table
+
+    AMP_df = load_table('./data/Figure_5.csv')
+    un_animals = ['a', 'b', 'd']
+
+    # Thresholds and confidence intervals of psignifit, as saved by Figure_5B.py
+    with open('./analysis_output/Figure_5B.txt') as file_object:
+        saved = [[int(v) for v in re.findall(r'-?\d+', line.split(':')[-1])] for line in file_object if '[' in line]
+
+    print("{:<8}{:>22}{:>22}{:>12}".format('animal', 'psignifit [dB]', 'preview [dB]', 'time [ms]'))
+    for m, animal in enumerate(un_animals):
+        subj_df = AMP_df[AMP_df.animal == animal][["level", "hits", "total"]].to_numpy().astype(int)
+
+        start = time.perf_counter()
+        res = preview_fit(subj_df)
+        elapsed = time.perf_counter() - start
+
+        print("{:<8}{:>22}{:>22}{:>12.1f}".format(
+            animal, "{} [{}, {}]".format(saved[0][m], saved[1][m], saved[2][m]),
+            "{:.0f} [{:.0f}, {:.0f}]".format(res['Fit'][0], *res['conf_Intervals'][0]), elapsed * 1000))
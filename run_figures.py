@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+Runner for the figure scripts: runs what changed, in parallel, and reports the run time of each script.
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+Every Figure_*.py script lists its input files and output files in its docstring. For each script
+the runner records, after a successful run, the content hash of its input files, the values of its
+parameters (the constants assigned at the top level of the script, e.g. sizeMult or
+CRT_minimumTrials), the hash of its code (the script and the modules of this repository it imports)
+and the files it wrote into "./analysis_output". A script is run again only when one of these
+changed or one of its outputs is missing; otherwise it is skipped.
+
+Each script runs in its own python process. Scripts that do not depend on each other (none reads
+the output of another) run at the same time, up to the number of workers.
+
+Usage:
+    python run_figures.py                  runs the scripts that are not up to date
+    python run_figures.py Figure_3CD.py    only the given scripts
+    python run_figures.py --force          all scripts, whether up to date or not
+    python run_figures.py --workers 4      at most four scripts at the same time
+    python run_figures.py --tables-only    only the tables, without drawing the plots (FIGURE_MODE=tables)
+    python run_figures.py --figures        also the draw and encode time, size and rasterized artists of each figure
+
+The report shows, for every script, the time spent importing modules (python -X importtime) and encoding its
+figure files (figure_sink.py) next to its run time.
+
+"""
+
+import argparse
+import ast
+import glob
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import data_cache
+from figure_mode import parse_importtime
+
+output_path = './analysis_output'
+input_paths = ['./data', './audio_files', './background_recordings']
+
+RUNNER_VERSION = 2
+
+
+def _manifest_path():
+    return os.path.join(data_cache.cache_path, 'runner.json')
+
+
+def _declared_files(docstring, heading):
+    # File names listed under "list of input files:" / "list of output files:" ("- a.csv , b.csv" per line)
+    names = []
+    lines = docstring.splitlines()
+    for i, line in enumerate(lines):
+        if line.strip().lower().startswith(heading):
+            for item in lines[i + 1:]:
+                if not item.strip().startswith('-'):
+                    break
+                names.extend(name.strip(' :') for name in item.strip()[1:].replace(';', ',').split(','))
+
+    return [name for name in names if name]
+
+
+def _find_input(name):
+    # Declared inputs are file names (sometimes without extension) in one of the input folders
+    for folder in input_paths:
+        matches = sorted(glob.glob(os.path.join(folder, glob.escape(name)))) or \
+            sorted(glob.glob(os.path.join(folder, glob.escape(name) + '.*')))
+        if matches:
+            return matches[0]
+
+    return None
+
+
+def _local_modules(filename, seen=None):
+    # The script and the modules of this repository it imports, directly or through other modules
+    seen = set() if seen is None else seen
+    seen.add(os.path.basename(filename))
+    with open(filename) as file_object:
+        tree = ast.parse(file_object.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module is not None and node.level == 0:
+            names = [node.module]
+        else:
+            continue
+        for name in names:
+            module = name.split('.')[0] + '.py'
+            if module not in seen and os.path.exists(module):
+                _local_modules(module, seen)
+
+    return seen
+
+
+def _parameters(tree):
+    # Constants assigned at the top level of a script; other assignments (e.g. x = -np.inf) are part of the code,
+    # whose hash is recorded anyway
+    parameters = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            try:
+                parameters[node.targets[0].id] = ast.literal_eval(node.value)
+            except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+                continue
+
+    return parameters
+
+
+def describe(script, mode='plots'):
+    """Declared inputs and outputs, input hashes, parameters, code hash and mode of a figure script."""
+    with open(script) as file_object:
+        tree = ast.parse(file_object.read())
+    docstring = ast.get_docstring(tree) or ''
+
+    inputs = {}
+    for name in _declared_files(docstring, 'list of input files'):
+        filename = _find_input(name)
+        inputs[name] = data_cache.file_hash(filename) if filename is not None else None
+
+    code = hashlib.sha1()
+    for module in sorted(_local_modules(script)):
+        code.update(module.encode())
+        code.update(data_cache.file_hash(module).encode())
+
+    return {'version': RUNNER_VERSION, 'mode': mode, 'inputs': inputs, 'parameters': _parameters(tree),
+            'code': code.hexdigest(), 'declared_outputs': _declared_files(docstring, 'list of output files')}
+
+
+def _outdated(description, record):
+    # Reason to run a script again, or None when it is up to date
+    if record is None:
+        return 'never run'
+    for name, reason in [('version', 'runner changed'), ('mode', 'mode changed'), ('inputs', 'inputs changed'),
+                         ('parameters', 'parameters changed'), ('code', 'code changed')]:
+        if record.get(name) != json.loads(json.dumps(description[name])):
+            return reason
+    if not all(os.path.exists(os.path.join(output_path, name)) for name in record['outputs']):
+        return 'outputs missing'
+
+    return None
+
+
+def _dependencies(descriptions):
+    # Scripts whose declared outputs are declared inputs of another script
+    producers = {name: script for script, description in descriptions.items()
+                 for name in description['declared_outputs']}
+
+    return {script: {producers[name] for name in description['inputs'] if producers.get(name, script) != script}
+            for script, description in descriptions.items()}
+
+
+# Runs a script as __main__ and saves the names of the files it opened for writing, which are its outputs
+# also when several scripts write into the output folder at the same time, and the records of its figure files
+_BOOTSTRAP = """
+import atexit, json, os, runpy, sys
+script, record = sys.argv[1:3]
+written = set()
+
+
+def save_record():
+    sink = sys.modules.get('figure_sink')
+    json.dump({'written': sorted(written), 'figures': sink.records if sink is not None else []}, open(record, 'w'))
+
+
+def hook(event, args):
+    if event == 'open' and isinstance(args[0], str):
+        mode, flags = args[1], args[2]
+        writing = any(c in mode for c in 'wax+') if mode is not None else flags & (os.O_WRONLY | os.O_RDWR)
+        if writing:
+            written.add(os.path.abspath(args[0]))
+
+
+sys.addaudithook(hook)
+atexit.register(save_record)
+sys.argv = [script]
+runpy.run_path(script, run_name='__main__')
+"""
+
+
+def _run(script, mode='plots'):
+    # Run a script in its own process; returns the wall time, the import time, the files it wrote, the records of
+    # its figure files and its error
+    handle, record = tempfile.mkstemp(suffix='.json')
+    os.close(handle)
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', _BOOTSTRAP, script, record],
+                             capture_output=True, text=True,
+                             env=dict(os.environ, MPLBACKEND='Agg', OUTDATED_IGNORE='1', FIGURE_MODE=mode))
+    elapsed = time.perf_counter() - start
+    imports = parse_importtime(process.stderr)
+
+    try:
+        with open(record) as file_object:
+            recorded = json.load(file_object)
+    except (OSError, ValueError):
+        recorded = {}
+    os.remove(record)
+    opened, figures = recorded.get('written', []), recorded.get('figures', [])
+    folder = os.path.abspath(output_path)
+    written = sorted({os.path.relpath(name, folder) for name in opened if os.path.dirname(name) == folder})
+
+    error = None
+    if process.returncode != 0:
+        # The exception that stopped the script; warnings may be printed after it
+        lines = [line for line in process.stderr.strip().splitlines() if not line.startswith('import time:')]
+        errors = [line for line in lines if re.match(r'[\w.]+(Error|Exception|Interrupt)\b', line)]
+        error = (errors or lines or ['exit code {}'.format(process.returncode)])[-1]
+
+    return elapsed, imports, written, figures, error
+
+
+def _load_manifest():
+    try:
+        with open(_manifest_path()) as file_object:
+            return json.load(file_object)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(manifest):
+    os.makedirs(data_cache.cache_path, exist_ok=True)
+    handle, temporary = tempfile.mkstemp(dir=data_cache.cache_path)
+    with os.fdopen(handle, 'w') as file_object:
+        json.dump(manifest, file_object, indent=1, default=str)
+    os.replace(temporary, _manifest_path())
+
+
+def run_figures(scripts=None, force=False, n_workers=None, mode='plots'):
+    """Run the figure scripts that are not up to date (in the given mode); returns one report row per script."""
+    scripts = sorted(glob.glob('Figure_*.py')) if not scripts else list(scripts)
+    n_workers = n_workers or os.cpu_count()
+    manifest = _load_manifest()
+
+    descriptions = {script: describe(script, mode) for script in scripts}
+    dependencies = _dependencies(descriptions)
+    reasons = {script: 'forced' if force else _outdated(descriptions[script], manifest.get(script))
+               for script in scripts}
+
+    report = {script: {'script': script, 'status': 'up to date', 'reason': '', 'time': 0.0, 'imports': 0.0,
+                       'figures': []}
+              for script in scripts if reasons[script] is None}
+    pending = [script for script in scripts if reasons[script] is not None]
+    running = {}
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        while pending or running:
+            # Start every script whose dependencies have finished
+            for script in [s for s in pending if not dependencies[s] & (set(pending) | set(running.values()))]:
+                running[executor.submit(_run, script, mode)] = script
+                pending.remove(script)
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                script = running.pop(future)
+                elapsed, imports, written, figures, error = future.result()
+                report[script] = {'script': script, 'status': 'failed' if error else 'ran',
+                                  'reason': error or reasons[script], 'time': elapsed, 'imports': imports,
+                                  'figures': figures}
+                if error is None:
+                    manifest[script] = dict(descriptions[script], outputs=written)
+                    _save_manifest(manifest)
+
+    return [report[script] for script in scripts]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the figure scripts whose inputs, parameters or code changed.")
+    parser.add_argument('scripts', nargs='*', help="scripts to consider (default: all Figure_*.py)")
+    parser.add_argument('--force', action='store_true', help="run the scripts even when they are up to date")
+    parser.add_argument('--workers', type=int, default=None, help="scripts running at the same time")
+    parser.add_argument('--tables-only', action='store_true', help="only save the tables, without drawing plots")
+    parser.add_argument('--figures', action='store_true', help="report the draw and encode time of every figure")
+    arguments = parser.parse_args()
+
+    start = time.perf_counter()
+    rows = run_figures(arguments.scripts, force=arguments.force, n_workers=arguments.workers,
+                       mode='tables' if arguments.tables_only else 'plots')
+    total = time.perf_counter() - start
+
+    print("{:<18}{:<12}{:>10}{:>13}{:>12}  {}".format('script', 'status', 'time [s]', 'imports [s]', 'encode [s]',
+                                                     'reason'))
+    for row in rows:
+        encode = sum(figure['encode'] for figure in row['figures'])
+        print("{:<18}{:<12}{:>10.1f}{:>13.1f}{:>12.1f}  {}".format(row['script'], row['status'], row['time'],
+                                                                  row['imports'], encode, row['reason'][:80]))
+    print("total wall time {:.1f} s, script time {:.1f} s, import time {:.1f} s".format(
+        total, sum(row['time'] for row in rows), sum(row['imports'] for row in rows)))
+
+    if arguments.figures:
+        print("\n{:<28}{:<8}{:>10}{:>12}{:>12}{:>12}".format('figure', 'format', 'draw [s]', 'encode [s]', 'size [kB]',
+                                                           'rasterized'))
+        for row in rows:
+            for figure in row['figures']:
+                print("{:<28}{:<8}{:>10.2f}{:>12.2f}{:>12.0f}{:>12}".format(figure['figure'], figure['format'],
+                                                                            figure['draw'], figure['encode'],
+                                                                            figure['size'] / 1000,
+                                                                            figure.get('rasterized', 0)))
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Acoustic features of the stimuli (duration, level, spectral shape) for every wav file of a folder.
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+For every stimulus the table holds its duration, sampling frequency, RMS and peak level (dB re full
+scale, integer samples are scaled to [-1, 1)) and three properties of its Welch power spectrum:
+the spectral centroid (power-weighted mean frequency), the bandwidth (power-weighted standard
+deviation around the centroid) and the dominant frequency (maximum of the spectrum). Each file is
+reduced with a few array operations; the files are spread over a pool of processes, so a library of
+hundreds of vocalisations is analysed in parallel.
+
+The stimuli of Figure 4C are named by their code in the HR tables (STIMULUS_FILES), so the features
+can be joined with the hit rates per task and stimulus.
+
+Running this file saves the features of "./audio_files" as "./analysis_output/Stimulus_features.csv",
+relates them to the hit rates of Figure_4C_HR.csv and times the pool on a synthetic library.
+
+"""
+
+import glob
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.io import wavfile
+
+from streaming_audio import WelchPSD, as_float
+
+# Stimulus codes of the HR tables of Figure 4C and their sound files
+STIMULUS_FILES = {'str': 'PureTone (sTr).wav', 'vocMAT': 'Voc. Twitter.wav', 'vocMAP': 'Voc. Phee.wav',
+                  'voc': 'Voc. Juvenile Call.wav', 'wNoise': 'Noise.wav'}
+
+
+def acoustic_features(filename, nperseg=1024):
+    """Duration, level and spectral features of a wav file (first channel of multi-channel files)."""
+    samplingFrequency, signalData = wavfile.read(filename)
+    if signalData.ndim > 1:
+        signalData = signalData[:, 0]
+    signal = as_float(signalData)
+
+    freqs, psd = WelchPSD(samplingFrequency, min(nperseg, len(signal))).update(signal).result()
+    weights = psd / psd.sum()
+    centroid = (freqs * weights).sum()
+
+    return {'stimulus': os.path.splitext(os.path.basename(filename))[0],
+            'duration': len(signal) / samplingFrequency,
+            'sampling_frequency': samplingFrequency,
+            'rms_dBFS': 10 * np.log10(np.mean(signal ** 2)),
+            'peak_dBFS': 20 * np.log10(np.abs(signal).max()),
+            'centroid': centroid,
+            'bandwidth': np.sqrt(((freqs - centroid) ** 2 * weights).sum()),
+            'dominant_frequency': freqs[np.argmax(psd)]}
+
+
+def feature_table(filenames, n_workers=None):
+    """Features of all files, one row per file (in the given order), computed in a pool of processes.
+
+    A script calling it needs a main guard, as for the psychometric fits.
+    """
+    filenames = list(filenames)
+
+    parallel = n_workers != 1 and len(filenames) > 1
+    if not parallel:
+        rows = [acoustic_features(filename) for filename in filenames]
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            rows = list(executor.map(acoustic_features, filenames, chunksize=max(1, len(filenames) // 64)))
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    from scipy.stats import spearmanr
+
+    from data_schema import load_table
+
+    sounds = sorted(glob.glob(os.path.join('./audio_files', '*.wav')))
+    features = feature_table(sounds)
+    features.to_csv('./analysis_output/Stimulus_features.csv', sep=';', index=False)
+    print(features.round(1).to_string(index=False))
+
+    # Hit rate of every stimulus in every task and animal, next to the features of the stimulus
+    HR = load_table('./data/Figure_4C_HR.csv')
+    HR['file'] = HR['stimulus'].map(STIMULUS_FILES).str[:-4]
+    merged = HR.merge(features, left_on='file', right_on='stimulus', suffixes=('', '_file'))
+    print("\nSpearman correlation with the hit rate ({} animal x task x stimulus rows)".format(len(merged)))
+    for feature in ['duration', 'rms_dBFS', 'centroid', 'bandwidth', 'dominant_frequency']:
+        rho, p = spearmanr(merged[feature], merged['hits'])
+        print("{:<22}rho = {:5.2f}, p = {:.3f}".format(feature, rho, p))
+
+    # A synthetic library of vocalisations: one process against the pool
+    directory = tempfile.mkdtemp()
+    rng = np.random.default_rng(0)
+    library = []
+    for i in range(200):
+        library.append(os.path.join(directory, 'call_{}.wav'.format(i)))
+        wavfile.write(library[-1], 96000, rng.normal(0, 3000, rng.integers(48000, 192000)).astype(np.int16))
+
+    timings = []
+    for n_workers in [1, None]:
+        start = time.perf_counter()
+        table = feature_table(library, n_workers=n_workers)
+        timings.append(time.perf_counter() - start)
+    print("\n{} files: {:.0f} ms in one process, {:.0f} ms in a pool of {} processes".format(
+        len(library), timings[0] * 1000, timings[1] * 1000, os.cpu_count()))
+
+    for filename in library:
+        os.remove(filename)
+    os.rmdir(directory)
@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming power spectral density and spectrogram of long background recordings (Figure 5C).
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+The recordings of the colony room are hours long, so they are never loaded into memory. The wav
+file is memory-mapped and read in blocks of whole segments (neighbouring blocks overlap by the
+segment overlap, so every segment of the recording is seen exactly once):
+
+- Welch PSD: the periodograms of all segments are summed block by block and averaged at the end.
+  The segments, window, detrending and scaling are those of scipy.signal.welch, so the result is
+  the same as welch on the whole recording; several recordings can be pooled into one estimate.
+- Spectrogram: the frames of matplotlib's specgram (NFFT, overlap, Hanning window) are averaged
+  in power over groups of neighbouring frames, so the spectrogram has at most max_columns columns
+  whatever the length of the recording.
+
+Memory is bounded by the block size, not by the length of the recording. For the PSD, integer samples
+are scaled to [-1, 1); the PSD is written in the layout of "./data/PSD_data.csv" (power in dB,
+frequency in Hz). The spectrogram keeps the integer samples as they are by default, as specgram on
+the samples read from the wav file, so its dB levels are those of the original Figure 5C
+(full_scale=True scales them to [-1, 1), which lowers the levels of 16-bit files by 20 log10(32768),
+about 90 dB).
+
+Running this file checks the streamed PSD and spectrogram against scipy and matplotlib on a
+synthetic recording, times them on a one-hour 96 kHz recording and, if the background recordings
+are available, saves their PSD as "./analysis_output/PSD_data.csv".
+
+"""
+
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.io import wavfile
+from scipy.signal import get_window
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def open_recording(filename):
+    """Sampling frequency and memory-mapped samples of a wav file (first channel of multi-channel files)."""
+    samplingFrequency, signalData = wavfile.read(filename, mmap=True)
+    if signalData.ndim > 1:
+        signalData = signalData[:, 0]
+
+    return samplingFrequency, signalData
+
+
+def as_float(block):
+    """Samples as float64; integer samples are scaled to [-1, 1), as float wav files are stored."""
+    if np.issubdtype(block.dtype, np.integer):
+        info = np.iinfo(block.dtype)
+        return (block.astype(np.float64) - (info.max + info.min + 1) / 2) / ((info.max - info.min + 1) / 2)
+
+    return block.astype(np.float64)
+
+
+def _n_frames(length, nperseg, step):
+    # Number of whole segments in a signal, none when it is shorter than one segment
+    return 1 + (length - nperseg) // step if length >= nperseg else 0
+
+
+def _frame_blocks(signal, nperseg, step, block_frames, full_scale=True):
+    # Consecutive blocks of frames (n x nperseg), read from the signal one block at a time
+    n_frames = _n_frames(len(signal), nperseg, step)
+    for first in range(0, n_frames, block_frames):
+        last = min(first + block_frames, n_frames)
+        block = np.asarray(signal[first * step:(last - 1) * step + nperseg])
+        block = as_float(block) if full_scale else block.astype(np.float64)
+        yield sliding_window_view(block, nperseg)[::step]
+
+
+class WelchPSD:
+
+    def __init__(self, fs, nperseg=256, noverlap=None, window='hann'):
+        self.fs = fs
+        self.nperseg = nperseg
+        self.step = nperseg - (nperseg // 2 if noverlap is None else noverlap)
+        self.window = get_window(window, nperseg)
+        self.power_sum = np.zeros(nperseg // 2 + 1)
+        self.n_segments = 0
+
+    def update(self, signal, block_frames=8192):
+        """Add the segments of a signal (an array or a memory map), one block at a time."""
+        for frames in _frame_blocks(signal, self.nperseg, self.step, block_frames):
+            # Constant detrending and window of every segment, as scipy.signal.welch
+            frames = (frames - frames.mean(axis=1, keepdims=True)) * self.window
+            self.power_sum += (np.abs(np.fft.rfft(frames, axis=1)) ** 2).sum(axis=0)
+            self.n_segments += len(frames)
+
+        return self
+
+    def result(self):
+        """Frequencies and one-sided power spectral density (V**2/Hz)."""
+        if self.n_segments == 0:
+            raise ValueError("No segment of {} samples was added to the spectrum".format(self.nperseg))
+        psd = self.power_sum / self.n_segments / (self.fs * (self.window ** 2).sum())
+        # One-sided spectrum: all bins but DC (and Nyquist for even segments) carry the power of both sides
+        psd[1:-1 if self.nperseg % 2 == 0 else None] *= 2
+
+        return np.fft.rfftfreq(self.nperseg, 1 / self.fs), psd
+
+
+def stream_spectrogram(signal, fs, NFFT=256, noverlap=128, max_columns=2000, full_scale=False):
+    """Spectrogram (psd, as matplotlib's specgram) with frames averaged down to at most max_columns columns.
+
+    Returns the power (frequency x column), the frequencies and the extent of the columns in seconds. A signal
+    shorter than NFFT has no column. Integer samples are scaled to [-1, 1) only with full_scale.
+    """
+    step = NFFT - noverlap
+    n_frames = _n_frames(len(signal), NFFT, step)
+    if n_frames == 0:
+        return np.zeros((NFFT // 2 + 1, 0)), np.fft.rfftfreq(NFFT, 1 / fs), np.array([0, len(signal) / fs, 0, fs / 2])
+
+    group = -(-n_frames // max_columns)
+    window = np.hanning(NFFT)
+    scale = np.where((np.arange(NFFT // 2 + 1) > 0) & (np.arange(NFFT // 2 + 1) < NFFT / 2), 2., 1.)
+    scale /= fs * (window ** 2).sum()
+
+    # Blocks hold whole groups of frames, so every column is completed within one block
+    columns = []
+    for frames in _frame_blocks(signal, NFFT, step, group * max(1, 8192 // group), full_scale):
+        power = np.abs(np.fft.rfft(frames * window, axis=1)) ** 2 * scale
+        starts = np.arange(0, len(power), group)
+        columns.append(np.add.reduceat(power, starts, axis=0) / np.diff(np.append(starts, len(power)))[:, None])
+
+    # Frame centres as specgram, padded by half a frame step on both sides
+    centres = (NFFT / 2 + np.array([0, n_frames - 1]) * step) / fs
+    pad = step / fs / 2
+
+    return (np.vstack(columns).T, np.fft.rfftfreq(NFFT, 1 / fs),
+            np.array([centres[0] - pad, centres[1] + pad, 0, fs / 2]))
+
+
+def psd_table(freqs, psd):
+    """PSD in the layout of PSD_data.csv: power in dB and frequency in Hz."""
+    return pd.DataFrame({'power': (10 * np.log10(psd)).astype(np.float32), 'freq': freqs})
+
+
+def recordings_psd(filenames, nperseg=256, noverlap=None):
+    """Welch PSD pooled over the segments of all recordings (which must share the sampling frequency)."""
+    welch = None
+    for filename in filenames:
+        samplingFrequency, signalData = open_recording(filename)
+        if welch is None:
+            welch = WelchPSD(samplingFrequency, nperseg, noverlap)
+        elif samplingFrequency != welch.fs:
+            raise ValueError("Recordings with different sampling frequencies cannot be pooled")
+        welch.update(signalData)
+
+    return psd_table(*welch.result())
+
+
+if __name__ == '__main__':
+    import tracemalloc
+
+    from matplotlib import mlab
+    from scipy.signal import welch
+
+    # Same results as scipy's welch and matplotlib's specgram on a short recording
+    rng = np.random.default_rng(0)
+    fs = 96000
+    signalData = (rng.normal(0, 2000, fs * 20) + 8000 * np.sin(2 * np.pi * 7000 * np.arange(fs * 20) / fs))
+    signalData = signalData.astype(np.int16)
+
+    freqs, psd = WelchPSD(fs).update(signalData, block_frames=1000).result()
+    reference = welch(signalData / 32768, fs=fs, nperseg=256)
+    assert np.allclose(freqs, reference[0]) and np.allclose(psd, reference[1], rtol=1e-9)
+
+    power, _, extent = stream_spectrogram(signalData / 32768, fs, max_columns=len(signalData))
+    spec, _, t = mlab.specgram(signalData / 32768, NFFT=256, Fs=fs, noverlap=128)
+    assert np.allclose(power, spec, rtol=1e-9) and np.isclose(extent[0], t[0] - 64 / fs)
+    power, _, _ = stream_spectrogram(signalData, fs, max_columns=len(signalData))
+    assert np.allclose(power, mlab.specgram(signalData, NFFT=256, Fs=fs, noverlap=128)[0], rtol=1e-9)
+    assert stream_spectrogram(np.zeros(100), fs)[0].shape == (129, 0)
+
+    # One hour at 96 kHz, streamed from a memory-mapped file
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, 'colony.wav')
+    hour = np.concatenate([signalData] * 180)
+    wavfile.write(filename, fs, hour)
+    del hour
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    PSD = recordings_psd([filename])
+    psd_time = time.perf_counter() - start
+    samplingFrequency, recording = open_recording(filename)
+    start = time.perf_counter()
+    power, freqs, extent = stream_spectrogram(recording, samplingFrequency)
+    spectrogram_time = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print("{:.0f} s recording ({:.0f} MB): PSD {:.1f} s, spectrogram {} x {} in {:.1f} s, "
+          "peak memory {:.0f} MB".format(len(recording) / samplingFrequency, os.path.getsize(filename) / 1e6,
+                                         psd_time, *power.shape, spectrogram_time, peak / 1e6))
+    print(PSD.head().to_string(index=False))
+
+    del recording
+    os.remove(filename)
+    os.rmdir(directory)
+
+    # PSD of the background recordings of Figure 5C, when they are available
+    clips = [os.path.join('./background_recordings', 'clip{}_MS.wav'.format(i)) for i in range(1, 4)]
+    if all(os.path.exists(clip) for clip in clips):
+        recordings_psd(clips).to_csv('./analysis_output/PSD_data.csv', index=False)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Hearing thresholds per session and over the accumulating sessions of Figure_5.csv.
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+Figure 5B fits all sessions of an animal at once. The tracker follows how the threshold converges
+as sessions are added: it fits every session alone and every prefix of sessions (session 1, sessions
+1-2, 1-3, ...). The model and grid are those of psychometric_preview. The log-likelihood of
+independent sessions adds up, so the tracker keeps the summed log-likelihood grid of the sessions
+seen so far (and their number of trials) and a new session costs one evaluation of its own
+log-likelihood on the grid; the history is never fitted again. The grid is set by the levels given
+to the tracker, and a session with a level outside of them is rejected.
+
+Running this file tracks the animals of Figure 5B and saves the table and plot in "./analysis_output"
+(python run_figures.py threshold_tracking.py runs it when its inputs changed).
+
+list of input files:
+- Figure_5.csv
+
+list of output files:
+- Figure_5B_sessions.csv
+- Figure_5B_sessions.png , Figure_5B_sessions.pdf
+
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from psychometric_preview import default_axes, estimate, log_likelihood, log_prior, pool_levels, preview_fit
+
+
+class ThresholdTracker:
+
+    def __init__(self, levels, alpha=0.05, confP=.95, grid_size=(60, 40, 12, 12)):
+        # The grid is fixed by the levels that can be presented, so the sessions can be summed on it
+        self.alpha = alpha
+        self.confP = confP
+        self.axes = default_axes(levels, grid_size)
+        self.prior = log_prior(self.axes)
+        self.levels = np.unique(levels).astype(float)
+
+        self.log_likelihood = np.zeros(self.prior.shape)
+        self.n_trials = 0
+        self.n_sessions = 0
+
+    def update(self, data):
+        """Add the (level, hits, total) matrix of a session; returns the session and cumulative estimates.
+
+        A session without trials has no estimate of its own (None).
+        """
+        levels, hits, total = pool_levels(data)
+        unknown = ~np.isin(levels, self.levels)
+        if unknown.any():
+            raise ValueError("Levels {} are not among the levels of the tracker".format(levels[unknown].tolist()))
+        session = log_likelihood(levels, hits, total, self.axes, self.alpha)
+
+        self.log_likelihood += session
+        self.n_trials += total.sum()
+        self.n_sessions += 1
+
+        single = estimate(session + self.prior, self.axes, self.confP) if total.sum() > 0 else None
+
+        return single, estimate(self.log_likelihood + self.prior, self.axes, self.confP)
+
+
+def track_thresholds(AMP_df, animals, **tracker_options):
+    """Threshold of every session alone and of all sessions up to it, for each animal."""
+    levels = AMP_df['level'].unique()
+    rows = []
+    for animal in animals:
+        tracker = ThresholdTracker(levels, **tracker_options)
+        subj_df = AMP_df[AMP_df['animal'] == animal]
+        for session, session_df in subj_df.groupby('session', sort=True):
+            single, cumulative = tracker.update(session_df[['level', 'hits', 'total']].to_numpy())
+            if single is None:
+                single = {'Fit': np.full(4, np.nan), 'conf_Intervals': np.full((4, 2), np.nan)}
+            rows.append({'animal': animal, 'session': session,
+                         'trials': session_df['total'].sum(), 'cumulative trials': tracker.n_trials,
+                         'threshold': single['Fit'][0],
+                         'CI low': single['conf_Intervals'][0, 0], 'CI high': single['conf_Intervals'][0, 1],
+                         'cumulative threshold': cumulative['Fit'][0],
+                         'cumulative CI low': cumulative['conf_Intervals'][0, 0],
+                         'cumulative CI high': cumulative['conf_Intervals'][0, 1]})
+
+    return pd.DataFrame(rows)
+
+
+def plot_tracking(tracking, animals, axs, colors):
+    """Session thresholds (points) and the cumulative threshold with its interval (line and band)."""
+    for ax, animal, color in zip(axs, animals, colors):
+        df = tracking[tracking['animal'] == animal]
+        ax.fill_between(df['session'], df['cumulative CI low'], df['cumulative CI high'], color=color, alpha=0.3,
+                        linewidth=0)
+        ax.plot(df['session'], df['cumulative threshold'], color=color)
+        ax.vlines(df['session'], df['CI low'], df['CI high'], color=color, linewidth=0.5)
+        ax.scatter(df['session'], df['threshold'], color=color, s=6)
+        ax.set_title('Animal {}'.format(animal))
+        ax.set_xlabel('Session')
+
+
+if __name__ == '__main__':
+    from data_schema import load_table
+    from figure_mode import configure
+    from figure_sink import finish_figures, save_figure
+
+    saveplot = 1
+    savetable = 1
+    save_path = "./analysis_output/"
+    plotting = configure(saveplot)
+
+    AMP_df = load_table('./data/Figure_5.csv')
+    un_animals = ['a', 'b', 'd']
+    cls = [[0.57, 0.47, 0.37],
+           [0.50, 0.44, 0.70],
+           [0.29, 0.44, 0.69]]
+
+    start = time.perf_counter()
+    tracking = track_thresholds(AMP_df, un_animals)
+    elapsed = time.perf_counter() - start
+
+    # Fitting every session and every prefix of sessions from scratch, for comparison
+    start = time.perf_counter()
+    for animal in un_animals:
+        subj_df = AMP_df[AMP_df['animal'] == animal]
+        for session in sorted(subj_df['session'].unique()):
+            session_df = subj_df[subj_df['session'] == session]
+            if session_df['total'].sum() > 0:
+                preview_fit(session_df[['level', 'hits', 'total']].to_numpy())
+            preview_fit(subj_df[subj_df['session'] <= session][['level', 'hits', 'total']].to_numpy())
+    refit = time.perf_counter() - start
+
+    print(tracking.round(1).to_string(index=False))
+    print("{} sessions: {:.0f} ms incremental, {:.0f} ms fitting sessions and prefixes from scratch".format(
+        len(tracking), elapsed * 1000, refit * 1000))
+
+    if savetable:
+        tracking.to_csv(os.path.join(save_path, 'Figure_5B_sessions.csv'), sep=';', decimal=".", index=False)
+
+    if plotting:
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+
+        sns.set(style="whitegrid")
+        sns.set_context("paper")
+
+        f, axs = plt.subplots(1, 3, sharey=True, figsize=(140 / 25.4, 60 / 25.4), constrained_layout=True)
+        plot_tracking(tracking, un_animals, axs, cls)
+        axs[0].set_ylabel('Threshold (dB SPL)')
+
+        if saveplot:
+            save_figure('Figure_5B_sessions')
+
+    finish_figures()
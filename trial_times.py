@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Ragged store of the trial times of each session (column "times" of Figure_1.csv).
+
+"Flexible auditory training, psychophysics, and enrichment
+of common marmosets with an automated, touchscreen-based system"
+
+by Calapai A.*, Cabrera-Moreno J.*, Moser T., Jeschke M.
+
+* shared contribution
+
+In the curated data file the trial times of a session are saved as the text of a list, e.g.
+"[0.01, 0.12, 0.5]". The store keeps the times of all sessions in a single flat float array and the
+position of each session in an array of offsets: the times of session i are
+values[offsets[i]:offsets[i + 1]]. The text is parsed once, without evaluating it as python code,
+and the result is saved next to the columnar cache of the data file.
+
+For a raster of many sessions the times can be binned instead of drawn one by one: histogram counts
+the trials of every selected session in equal time bins with a single bincount over the flat values,
+and plot_trial_density draws the session x bin counts as one image, in place of an eventplot with one
+line per trial. The image looks like the eventplot (a bin holding a trial is filled with the colour of
+the lines), but drawing it costs the same for a thousand trials or a million.
+
+Running this file compares the parser against the previous row-by-row eval() on synthetic sessions,
+and the eventplot against the density image.
+
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_cache
+from data_schema import load_table
+from figure_mode import lazy_import
+
+mpl = lazy_import('matplotlib')
+mcolors = lazy_import('matplotlib.colors')
+
+# Characters of the list notation that are not part of the numbers
+_list_characters = str.maketrans('[](),', '     ')
+
+
+class TrialTimes:
+
+    def __init__(self, values, offsets):
+        self.values = values
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @classmethod
+    def from_strings(cls, times):
+        # Sessions without trial times (NaN) become empty sessions
+        text = pd.Series(times, dtype=object).fillna('').astype(str)
+        text = text.where(text != 'nan', '')
+        translated = text.str.translate(_list_characters)
+
+        counts = translated.str.split().str.len().to_numpy()
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        # The tokens of all sessions are converted to float in one call, which rejects anything that is not a number
+        values = np.array(' '.join(translated).split(), dtype=float)
+
+        return cls(values, offsets)
+
+    def counts(self):
+        return np.diff(self.offsets)
+
+    def session(self, i):
+        return self.values[self.offsets[i]:self.offsets[i + 1]]
+
+    def select(self, mask):
+        """Return the trial times of the sessions selected by a boolean mask (or row positions) as array views."""
+        rows = np.flatnonzero(mask) if np.asarray(mask).dtype == bool else np.asarray(mask)
+
+        return [self.values[self.offsets[i]:self.offsets[i + 1]] for i in rows]
+
+    def histogram(self, mask, bins, time_range=(0, 1)):
+        """Trial counts of the selected sessions in equal time bins, one row per session (sessions x bins)."""
+        rows = np.flatnonzero(mask) if np.asarray(mask).dtype == bool else np.asarray(mask, dtype=np.int64)
+        counts = self.counts()[rows]
+
+        # Positions of the times of the selected sessions in the flat values, and the row of each of them
+        first = np.cumsum(counts) - counts
+        positions = np.arange(counts.sum()) + np.repeat(self.offsets[rows] - first, counts)
+        session = np.repeat(np.arange(len(rows)), counts)
+
+        # Bins as np.histogram: the last bin includes the upper edge, times outside the range are dropped
+        low, high = time_range
+        times = self.values[positions]
+        inside = (times >= low) & (times <= high)
+        times = times[inside]
+        column = np.minimum(((times - low) * (bins / (high - low))).astype(np.int64), bins - 1)
+
+        # Times on a bin edge go to the bin starting there, whatever the rounding of the division
+        edges = np.linspace(low, high, bins + 1)
+        column[times < edges[column]] -= 1
+        column[(times >= edges[column + 1]) & (column != bins - 1)] += 1
+
+        return np.bincount(session[inside] * bins + column, minlength=len(rows) * bins).reshape(len(rows), bins)
+
+    def save(self, filename, source):
+        np.savez(filename, values=self.values, offsets=self.offsets,
+                 mtime=source['mtime'], size=source['size'], hash=source['hash'])
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as stored:
+            source = {'mtime': int(stored['mtime']), 'size': int(stored['size']), 'hash': str(stored['hash'])}
+            return cls(stored['values'], stored['offsets']), source
+
+
+def plot_trial_density(ax, trial_times, mask, n_bins=None, color='grey', time_range=(0, 1)):
+    """Draw the trial times of the selected sessions as an image of trial counts per session and time bin.
+
+    The image is placed as eventplot(times, lineoffsets=1, linelengths=1) places the lines. The number of bins
+    defaults to the width of the axes divided by the width of the lines of an eventplot, so that a bin holding a
+    trial, which takes the colour of the lines, is as wide as the line of the trial.
+    """
+    if n_bins is None:
+        figure = ax.get_figure()
+        width = ax.get_position().width * figure.get_figwidth() * 72
+        n_bins = max(1, int(round(width / mpl.rcParams['lines.linewidth'])))
+    counts = trial_times.histogram(mask, n_bins, time_range)
+
+    # Empty bins are transparent, one trial or more is the full colour; session i is centred on y = i
+    colormap = mcolors.LinearSegmentedColormap.from_list('trials', [mcolors.to_rgba(color, 0), color])
+    extent = (time_range[0], time_range[1], -0.5, len(counts) - 0.5)
+
+    return ax.imshow(counts, cmap=colormap, vmin=0, vmax=1, extent=extent, origin='lower', aspect='auto',
+                     interpolation='nearest', zorder=2)
+
+
+def load_trial_times(filename, column='times', use_cache=True):
+    """Load the ragged trial times of a data file, parsing the text only when the file changed."""
+    target = os.path.join(data_cache.cache_path,
+                          "{}.{}.npz".format(os.path.splitext(os.path.basename(filename))[0], column))
+
+    if use_cache and os.path.exists(target):
+        trial_times, source = TrialTimes.load(target)
+        recorded_mtime = source['mtime']
+        if data_cache.source_unchanged(filename, source):
+            if source['mtime'] != recorded_mtime:
+                trial_times.save(target, source)
+            return trial_times
+
+    trial_times = TrialTimes.from_strings(load_table(filename, use_cache=use_cache)[column])
+    if use_cache:
+        os.makedirs(data_cache.cache_path, exist_ok=True)
+        trial_times.save(target, data_cache.source_info(filename, with_hash=True))
+
+    return trial_times
+
+
+if __name__ == '__main__':
+    # Compare the parser with evaluating every session separately
+    rng = np.random.default_rng(0)
+    n_sessions = 5000
+    sessions = [str(np.sort(rng.random(rng.integers(0, 400))).round(4).tolist()) for _ in range(n_sessions)]
+    sessions[::50] = [np.nan] * len(sessions[::50])
+
+    start = time.perf_counter()
+    evaluated = [np.array(eval(s)).flatten() if str(s) != 'nan' else np.array([]) for s in sessions]
+    eval_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    trial_times = TrialTimes.from_strings(sessions)
+    parse_time = time.perf_counter() - start
+
+    assert all(np.array_equal(a, b) for a, b in zip(evaluated, trial_times.select(np.ones(n_sessions, bool))))
+
+    print("{} sessions, {} trials".format(n_sessions, len(trial_times.values)))
+    print("eval: {:.1f} ms, ragged parser: {:.1f} ms".format(eval_time * 1000, parse_time * 1000))
+
+    # Same counts as np.histogram session by session
+    selected = np.arange(n_sessions) % 3 == 0
+    counts = trial_times.histogram(selected, 200)
+    assert all(np.array_equal(row, np.histogram(times, 200, (0, 1))[0])
+               for row, times in zip(counts, trial_times.select(selected)))
+
+    # Draw time of the raster of an animal with many trials: one line per trial against the density image
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    sessions = [str(np.sort(rng.random(rng.integers(200, 600))).round(4).tolist()) for _ in range(1000)]
+    trial_times = TrialTimes.from_strings(sessions)
+    everything = np.ones(len(trial_times), bool)
+    for name in ['eventplot', 'density']:
+        f, ax = plt.subplots(figsize=(90 / 25.4, 30 / 25.4))
+        start = time.perf_counter()
+        if name == 'eventplot':
+            ax.eventplot(trial_times.select(everything), color='grey', lineoffsets=1, linelengths=1)
+        else:
+            plot_trial_density(ax, trial_times, everything)
+        ax.set_xlim(0, 1)
+        f.canvas.draw()
+        print("{} sessions, {} trials, {}: {:.0f} ms".format(len(trial_times), len(trial_times.values), name,
+                                                             (time.perf_counter() - start) * 1000))
+        plt.close(f)